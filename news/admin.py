@@ -1,15 +1,188 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
-from .models import Comment, News
+from .bulk import DELETE, FLAG, Progress, moderate
+from .forms import bad_words
+from .models import BannedWord, Comment, News
+from .search import filter_news
 
 
-class CommentInline(admin.StackedInline):
-    model = Comment
-    extra = 0
+def estimate_rows(queryset):
+    """
+    Примерное число строк таблицы без COUNT(*) или None.
+
+    PostgreSQL хранит оценку в pg_class. На SQLite берётся наибольший
+    id: он читается из конца индекса и завышает число строк на число
+    удалённых.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] > 0 else None
+    if connection.vendor == 'sqlite':
+        return model._default_manager.using(queryset.db).aggregate(
+            last=Max('pk')
+        )['last']
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Для списка без фильтров большой таблицы число строк оценивается.
+
+    Точный COUNT(*) по миллионам строк дольше самой страницы списка.
+    Отфильтрованные списки и небольшие таблицы считаются точно.
+    """
+    exact_count_limit = 10_000
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimate_rows(self.object_list)
+            if estimate is not None and estimate > self.exact_count_limit:
+                return estimate
+        return super().count
+
+
+class ProjectedChangeList(ChangeList):
+    """Список объектов, который читает только колонки list_only."""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).only(
+            *self.model_admin.list_only
+        )
+
+
+class ProjectedListMixin:
+    """
+    Список в админке без тяжёлых колонок.
+
+    list_only перечисляет поля, которые нужны list_display; остальные,
+    например полный текст, на страницу списка не загружаются.
+    Число строк большой таблицы оценивается, а не считается.
+    """
+    list_only = ()
+    paginator = EstimatedCountPaginator
+    # Иначе под фильтрованным списком считается ещё и вся таблица.
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return ProjectedChangeList
+
+
+class DiscussionFilter(admin.SimpleListFilter):
+    title = 'обсуждение'
+    parameter_name = 'discussed'
+
+    def lookups(self, request, model_admin):
+        return (('yes', 'С комментариями'), ('no', 'Без комментариев'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(comment_count__gt=0)
+        if self.value() == 'no':
+            return queryset.filter(comment_count=0)
+        return queryset
 
 
 @admin.register(News)
-class NewsAdmin(admin.ModelAdmin):
-    inlines = [
-        CommentInline,
-    ]
+class NewsAdmin(ProjectedListMixin, admin.ModelAdmin):
+    list_display = ('title', 'date', 'comment_count')
+    list_only = list_display
+    list_filter = (DiscussionFilter,)
+    date_hierarchy = 'date'
+    # Ищет по полнотекстовому индексу, см. get_search_results.
+    search_fields = ('title',)
+    search_help_text = 'Все слова запроса в заголовке или тексте.'
+    # Комментарии не встраиваются в страницу новости: у популярной
+    # новости их тысячи. Ссылка ведёт в список комментариев новости.
+    readonly_fields = ('comments_link',)
+
+    @admin.display(description='Комментарии')
+    def comments_link(self, news):
+        if news.pk is None:
+            return '—'
+        return format_html(
+            '<a href="{}?news__id__exact={}">Комментариев: {}</a>',
+            reverse('admin:news_comment_changelist'),
+            news.pk,
+            news.comment_count,
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        return filter_news(queryset, search_term), False
+
+
+@admin.register(Comment)
+class CommentAdmin(ProjectedListMixin, admin.ModelAdmin):
+    list_display = ('id', 'news', 'author', 'created', 'is_flagged')
+    list_select_related = ('news', 'author')
+    # text читает __str__ комментария: подпись флажка действий.
+    list_only = (
+        'news__title', 'author__username', 'created', 'text', 'is_flagged'
+    )
+    list_filter = ('is_flagged',)
+    # Выпадающие списки из всех новостей и пользователей не строятся.
+    raw_id_fields = ('news', 'author')
+    # Точное имя пользователя: поиск по индексу, а не по всему тексту.
+    search_fields = ('=author__username',)
+    search_help_text = 'Имя автора целиком.'
+    # По id, а не по Meta.ordering: у created нет отдельного индекса.
+    ordering = ('-id',)
+    # Действия над всеми найденными комментариями идут пачками,
+    # см. news.bulk: без страницы подтверждения со списком объектов.
+    actions = ('delete_in_chunks', 'flag_in_chunks', 'flag_banned')
+
+    def get_readonly_fields(self, request, obj=None):
+        # Перенос комментария к другой новости обошёл бы счётчики,
+        # рейтинги и кэш обеих новостей: их ведут сигналы создания
+        # и удаления.
+        if obj is not None:
+            return ('news', 'author')
+        return ()
+
+    def moderate(self, request, queryset, action, banned_words=None):
+        progress = Progress(0, 0, 0)
+        for progress in moderate(queryset, action, banned_words):
+            pass
+        self.message_user(
+            request,
+            f'Проверено: {progress.checked}, подошло: {progress.matched}, '
+            f'изменено: {progress.affected}.',
+        )
+
+    @admin.action(
+        permissions=('delete',), description='Удалить пачками'
+    )
+    def delete_in_chunks(self, request, queryset):
+        self.moderate(request, queryset, DELETE)
+
+    @admin.action(
+        permissions=('change',), description='Отметить для проверки'
+    )
+    def flag_in_chunks(self, request, queryset):
+        self.moderate(request, queryset, FLAG)
+
+    @admin.action(
+        permissions=('change',),
+        description='Отметить комментарии с запрещёнными словами',
+    )
+    def flag_banned(self, request, queryset):
+        self.moderate(request, queryset, FLAG, bad_words)
+
+
+@admin.register(BannedWord)
+class BannedWordAdmin(admin.ModelAdmin):
+    search_fields = ('word',)
@@ -0,0 +1,84 @@
+"""
+Пользователь запроса без обращения к базе.
+
+AuthenticationMiddleware на каждой странице загружает пользователя по id
+из сессии только ради шапки. CachedModelBackend держит пользователей
+в памяти процесса и сверяет их с версией в общем кэше. Версию меняют
+сигналы при сохранении и удалении пользователя и при выходе, так что
+смена пароля, блокировка и выход видны всем процессам на следующем же
+запросе. Изменения через QuerySet.update() сигналов не вызывают:
+после них нужен bump_user_version. Всё это верно только для общего
+кэша: настройки включают бэкенд с YANEWS_REDIS_URL, см. news.checks.
+"""
+import copy
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+
+from .cache import get_user_version
+
+
+class UserCache:
+    """Последние загруженные пользователи процесса с их версиями."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def get(self, user_id):
+        """Копия пользователя, если его версия не менялась, иначе None."""
+        with self._lock:
+            entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        version, user = entry
+        if version != get_user_version(user_id):
+            with self._lock:
+                self._users.pop(user_id, None)
+            return None
+        with self._lock:
+            if user_id in self._users:
+                self._users.move_to_end(user_id)
+        # Копия: атрибуты, которые запрос добавит пользователю
+        # (кэш прав, backend), не должны достаться другим запросам.
+        return copy.copy(user)
+
+    def add(self, version, user):
+        with self._lock:
+            self._users[user.pk] = (version, copy.copy(user))
+            self._users.move_to_end(user.pk)
+            while len(self._users) > settings.NEWS_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+
+user_cache = UserCache()
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из user_cache."""
+
+    def get_user(self, user_id):
+        user = user_cache.get(user_id)
+        if user is None:
+            # Версия читается до загрузки: правка, случившаяся между
+            # ними, сменит версию, и устаревший объект не пригодится.
+            version = get_user_version(user_id)
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache.add(version, user)
+        return user
+
+    async def aget_user(self, user_id):
+        user = user_cache.get(user_id)
+        if user is None:
+            version = get_user_version(user_id)
+            user = await super().aget_user(user_id)
+            if user is not None:
+                user_cache.add(version, user)
+        return user
@@ -0,0 +1,84 @@
+"""
+Пакетная модерация комментариев: удаление и отметка для проверки.
+
+Комментарии перебираются пачками по id, ключом, без OFFSET. Каждая пачка
+обрабатывается в своей короткой транзакции, поэтому чистка большой
+таблицы не держит блокировку до конца. Удаление пачки — один SELECT и
+один DELETE. Счётчики новостей, почасовые счётчики рейтингов и версии
+кэша обновляются запросом на пачку, а не на каждый комментарий.
+"""
+from collections import Counter, namedtuple
+
+from django.db import transaction
+
+from . import counters, ranking
+from .models import Comment
+from .signals import invalidate
+
+DELETE = 'delete'
+FLAG = 'flag'
+CHUNK_SIZE = 500
+
+# Нарастающие итоги: просмотрено, подошло под фильтры, изменено.
+Progress = namedtuple('Progress', ('checked', 'matched', 'affected'))
+
+
+def filter_comments(author=None, news=None, since=None, until=None):
+    """Комментарии автора (имя), новости (id) и за полуинтервал времени."""
+    queryset = Comment.objects.all()
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if news is not None:
+        queryset = queryset.filter(news_id=news)
+    if since is not None:
+        queryset = queryset.filter(created__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created__lt=until)
+    return queryset
+
+
+def moderate(queryset, action, banned_words=None, chunk_size=CHUNK_SIZE):
+    """
+    Удаляет или отмечает комментарии queryset пачками.
+
+    С banned_words (например, словарём CommentForm) затрагиваются только
+    комментарии с запрещёнными словами. Генератор: после каждой пачки
+    отдаёт Progress, уже вне транзакции.
+    """
+    fields = ('pk', 'news_id', 'created')
+    if banned_words is not None:
+        fields += ('text',)
+    rows = queryset.order_by('pk').values_list(*fields)
+    checked = matched = affected = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(rows.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1][0]
+            checked += len(chunk)
+            if banned_words is not None:
+                chunk = [row for row in chunk if banned_words.search(row[3])]
+            matched += len(chunk)
+            if chunk:
+                affected += _apply(action, chunk)
+        yield Progress(checked, matched, affected)
+
+
+def _apply(action, rows):
+    pks = [row[0] for row in rows]
+    if action == FLAG:
+        return Comment.objects.filter(
+            pk__in=pks, is_flagged=False
+        ).update(is_flagged=True)
+    # Строки пачки прочитаны в этой же транзакции: поправки счётчиков
+    # сходятся с тем, что удалено.
+    with counters.deferred():
+        deleted, _ = Comment.objects.filter(pk__in=pks).only(
+            'news', 'created'
+        ).delete()
+    counters.comments_removed(Counter(row[1] for row in rows))
+    ranking.comments_removed((row[1], row[2]) for row in rows)
+    invalidate(*{row[1] for row in rows})
+    return deleted
@@ -0,0 +1,227 @@
+"""Версии содержимого, по которым кэшируются отрисованные страницы."""
+from collections import namedtuple
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+
+from .models import News
+from .pagination import (
+    aget_comment_page, get_comment_page, normalize_cursor
+)
+from .ranking import get_ranking
+from .routers import reading_replica
+
+CONTENT_VERSION_KEY = 'news:content-version'
+BANNED_WORDS_VERSION_KEY = 'news:banned-words-version'
+SEARCH_VERSION_KEY = 'news:search-version'
+NEWS_VERSION_KEY = 'news:version:{}'
+USER_VERSION_KEY = 'news:user-version:{}'
+COMMENT_TEMPLATE = 'news/includes/comment.html'
+NEWS_LIST_TEMPLATE = 'news/includes/news_list.html'
+# Всё, что шаблон списка новостей берёт из новости: без полного текста.
+NEWS_LIST_FIELDS = ('title', 'date', 'excerpt', 'comment_count')
+
+# Общая для всех читателей часть комментария. Автор нужен,
+# чтобы дорисовать ссылки редактирования без обращения к базе.
+CommentBlock = namedtuple('CommentBlock', ('pk', 'author_id', 'html'))
+
+
+def _new_version():
+    # Случайная метка, а не счётчик: после очистки кэша версия
+    # не может совпасть с одной из прежних.
+    return uuid4().hex
+
+
+def get_content_version():
+    """Текущая версия новостей и комментариев."""
+    return cache.get_or_set(CONTENT_VERSION_KEY, _new_version, timeout=None)
+
+
+def bump_content_version():
+    """Делает устаревшими все фрагменты, закэшированные по прежней версии."""
+    cache.set(CONTENT_VERSION_KEY, _new_version(), timeout=None)
+
+
+def get_banned_words_version():
+    """Текущая версия словаря запрещённых слов."""
+    return cache.get_or_set(
+        BANNED_WORDS_VERSION_KEY, _new_version, timeout=None
+    )
+
+
+def bump_banned_words_version():
+    cache.set(BANNED_WORDS_VERSION_KEY, _new_version(), timeout=None)
+
+
+def get_search_version():
+    """Версия заголовков и текстов новостей для поискового индекса."""
+    return cache.get_or_set(SEARCH_VERSION_KEY, _new_version, timeout=None)
+
+
+def bump_search_version():
+    version = _new_version()
+    cache.set(SEARCH_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def get_news_version(news_id):
+    """Текущая версия одной новости вместе с её комментариями."""
+    return cache.get_or_set(
+        NEWS_VERSION_KEY.format(news_id), _new_version, timeout=None
+    )
+
+
+def bump_news_version(news_id):
+    cache.set(NEWS_VERSION_KEY.format(news_id), _new_version(), timeout=None)
+
+
+def get_user_version(user_id):
+    """Версия пользователя для кэша пользователей в процессах."""
+    return cache.get_or_set(
+        USER_VERSION_KEY.format(user_id), _new_version, timeout=None
+    )
+
+
+def bump_user_version(user_id):
+    cache.set(USER_VERSION_KEY.format(user_id), _new_version(), timeout=None)
+
+
+def _fragment(key):
+    """
+    Ключ и время жизни фрагмента, отрисованного в текущем запросе.
+
+    Фрагменты с реплики хранятся отдельно и недолго. Версия меняется
+    при записи сразу, а реплика получает запись позже. Без этого
+    отставшая реплика отрисовала бы старые данные под новой версией:
+    их видели бы все, включая автора правки, до истечения кэша.
+    """
+    if reading_replica():
+        return f'{key}:replica', settings.NEWS_REPLICA_LAG
+    return key, settings.NEWS_CACHE_TIMEOUT
+
+
+def get_cached_news_list(queryset):
+    """
+    Список новостей главной страницы, отрисованный один раз на версию.
+
+    Запрос ленивый: при попадании в кэш он не выполняется вовсе.
+    """
+    key, timeout = _fragment(f'news:home:{get_content_version()}')
+    return cache.get_or_set(
+        key,
+        lambda: render_to_string(
+            NEWS_LIST_TEMPLATE, {'object_list': queryset}
+        ),
+        timeout,
+    )
+
+
+def get_cached_feed(feed):
+    """
+    Лента по рейтингу, отрисованная один раз на рейтинг и версию.
+
+    Новости рейтинга читаются одним запросом по первичному ключу.
+    """
+    ranking = get_ranking(feed)
+
+    def render():
+        news = News.objects.only(*NEWS_LIST_FIELDS).in_bulk(
+            ranking.news_ids
+        )
+        return render_to_string(NEWS_LIST_TEMPLATE, {'object_list': [
+            news[pk] for pk in ranking.news_ids if pk in news
+        ]})
+
+    key, timeout = _fragment(
+        f'news:feed:{feed}:{ranking.version}:{get_content_version()}'
+    )
+    return cache.get_or_set(key, render, timeout)
+
+
+# Асинхронные варианты ждут только базу. Кэш вызывается синхронно:
+# встроенные бэкенды Django не умеют асинхронно и выполняли бы каждый
+# cache.aget в отдельном потоке, а обращение к кэшу в памяти дешевле
+# такого переключения.
+async def aget_cached_news_list(queryset):
+    key, timeout = _fragment(f'news:home:{get_content_version()}')
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            NEWS_LIST_TEMPLATE,
+            {'object_list': [news async for news in queryset]},
+        )
+        cache.set(key, html, timeout)
+    return html
+
+
+def get_cached_news(news_id):
+    """Новость из кэша; отсутствующая новость даёт 404 и не кэшируется."""
+    key, timeout = _fragment(
+        f'news:object:{news_id}:{get_news_version(news_id)}'
+    )
+    return cache.get_or_set(
+        key, lambda: get_object_or_404(News, pk=news_id), timeout
+    )
+
+
+async def aget_cached_news(news_id):
+    key, timeout = _fragment(
+        f'news:object:{news_id}:{get_news_version(news_id)}'
+    )
+    news = cache.get(key)
+    if news is None:
+        try:
+            news = await News.objects.aget(pk=news_id)
+        except News.DoesNotExist:
+            raise Http404('Новость не найдена.')
+        cache.set(key, news, timeout)
+    return news
+
+
+def _comment_page_key(news_id, version, cursor):
+    if cursor:
+        cursor = normalize_cursor(cursor)
+    return _fragment(f'news:comments:{news_id}:{version}:{cursor or ""}')
+
+
+def _render_comment_page(page):
+    return page._replace(comments=[
+        CommentBlock(
+            comment.pk,
+            comment.author_id,
+            render_to_string(COMMENT_TEMPLATE, {'comment': comment}),
+        )
+        for comment in page.comments
+    ])
+
+
+def get_cached_comment_page(news_id, cursor=None):
+    """
+    Порция комментариев, отрисованная один раз на версию новости.
+
+    В кэше лежит только общая для всех читателей разметка; ссылки
+    «Редактировать» и «Удалить» шаблон добавляет по author_id.
+    """
+    key, timeout = _comment_page_key(
+        news_id, get_news_version(news_id), cursor
+    )
+    page = cache.get(key)
+    if page is None:
+        page = _render_comment_page(get_comment_page(news_id, cursor))
+        cache.set(key, page, timeout)
+    return page
+
+
+async def aget_cached_comment_page(news_id, cursor=None):
+    key, timeout = _comment_page_key(
+        news_id, get_news_version(news_id), cursor
+    )
+    page = cache.get(key)
+    if page is None:
+        page = _render_comment_page(await aget_comment_page(news_id, cursor))
+        cache.set(key, page, timeout)
+    return page
@@ -0,0 +1,64 @@
+"""Проверки настроек, от которых зависит корректность кэшей news."""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+# Кэши, которые каждый процесс держит у себя.
+PROCESS_LOCAL_CACHES = frozenset({
+    LOCMEM_CACHE,
+    'django.core.cache.backends.dummy.DummyCache',
+})
+CACHED_SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+CACHED_USER_BACKEND = 'news.auth.CachedModelBackend'
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Кэш сессий и пользователей требует общего для процессов кэша.
+
+    С кэшем в памяти выход и смена пароля сбрасывают сессию и
+    пользователя только в том процессе, где случились: остальные
+    процессы пускают по старой сессии до её истечения.
+    """
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    uses = []
+    if settings.SESSION_ENGINE == CACHED_SESSION_ENGINE:
+        uses.append(f'SESSION_ENGINE = {CACHED_SESSION_ENGINE!r}')
+    if CACHED_USER_BACKEND in settings.AUTHENTICATION_BACKENDS:
+        uses.append(f'{CACHED_USER_BACKEND} в AUTHENTICATION_BACKENDS')
+    return [
+        Warning(
+            f'{use} с кэшем, своим у каждого процесса: выход и смена '
+            'пароля не завершат сессию в других процессах.',
+            hint='Укажите общий кэш (YANEWS_REDIS_URL) или запускайте '
+            'один процесс.',
+            id='news.W001',
+        )
+        for use in uses
+    ]
+
+
+@register()
+def check_cache_versions(app_configs, **kwargs):
+    """
+    Версии в кэше (news.cache) должны быть общими для процессов.
+
+    По ним процессы узнают об изменениях новостей, словаря запрещённых
+    слов и пользователей. С кэшем в памяти версию меняет только процесс,
+    где случилась правка: остальные отдают старые страницы, ETag и
+    словарь. Без кэша (DummyCache) устаревать нечему.
+    """
+    if settings.CACHES['default']['BACKEND'] != LOCMEM_CACHE:
+        return []
+    return [
+        Warning(
+            'Версии кэша news хранятся в памяти процесса: после правок '
+            'другие процессы отдают устаревшие страницы, ETag и словарь '
+            'запрещённых слов.',
+            hint='Укажите общий кэш (YANEWS_REDIS_URL). С одним процессом '
+            'предупреждение можно отключить в SILENCED_SYSTEM_CHECKS.',
+            id='news.W002',
+        )
+    ]
@@ -0,0 +1,77 @@
+"""
+Условные GET для главной страницы и страницы новости.
+
+ETag строится из версии содержимого в кэше, без отрисовки шаблона и без
+чтения новостей: версии меняются при любой записи новостей и комментариев
+(см. news.signals). В ETag входит и id пользователя из сессии: от него
+зависят шапка, форма комментария и ссылки на правку. Форма содержит
+CSRF-токен, а вход меняет его, даже если снова вошёл тот же
+пользователь. Поэтому для вошедшего в ETag входит и ключ сессии: вход
+тоже меняет его, а ключ берётся из cookie без чтения сессии. Сама
+CSRF-cookie не подходит: при первом заходе её ещё нет, и ETag не
+совпал бы со следующим запросом. Ответ 304 не требует запросов к базе,
+кроме чтения сессии, если она хранится в базе.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .cache import get_content_version, get_news_version
+from .routers import reading_replica
+
+
+def page_etag(request, version, user_id):
+    parts = [version, user_id or '']
+    if user_id:
+        parts.append(request.session.session_key)
+    if reading_replica():
+        # Страница с отставшей реплики могла быть отрисована по новой
+        # версии со старыми данными: её ETag живёт не дольше отставания.
+        parts.append(int(time.time() // settings.NEWS_REPLICA_LAG))
+    return quote_etag(hashlib.md5(
+        ':'.join(map(str, parts)).encode(), usedforsecurity=False
+    ).hexdigest())
+
+
+def home_etag(request, *args, **kwargs):
+    return page_etag(
+        request, get_content_version(), request.session.get(SESSION_KEY)
+    )
+
+
+def news_etag(request, *args, pk, **kwargs):
+    return page_etag(
+        request, get_news_version(pk), request.session.get(SESSION_KEY)
+    )
+
+
+async def ahome_etag(request):
+    return page_etag(
+        request, get_content_version(),
+        await request.session.aget(SESSION_KEY),
+    )
+
+
+async def anews_etag(request, pk):
+    return page_etag(
+        request, get_news_version(pk),
+        await request.session.aget(SESSION_KEY),
+    )
+
+
+async def acondition(request, etag, render):
+    """
+    Асинхронный вариант декоратора condition для метода get.
+
+    ETag вычисляется заранее: декоратор вызвал бы etag_func синхронно,
+    а сессию из асинхронного кода можно читать только через aget.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = await render()
+    response.headers.setdefault('ETag', etag)
+    return response
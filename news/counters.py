@@ -0,0 +1,117 @@
+"""Число комментариев и время последнего из них, хранимые в News."""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Q, QuerySet, Subquery, Value,
+    When
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, News
+
+_deferred = ContextVar('comment_counters_deferred', default=False)
+
+
+@contextmanager
+def deferred():
+    """
+    Сигналы комментариев внутри блока не обновляют ничего сами.
+
+    Для пакетных операций: счётчики, рейтинги и версии кэша вызывающий
+    обновляет сам, по запросу на пачку, а не на каждый комментарий.
+    """
+    token = _deferred.set(True)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+
+
+def is_deferred():
+    return _deferred.get()
+
+
+def _comments_of_news():
+    return Comment.objects.filter(news=OuterRef('pk')).order_by()
+
+
+def actual_comment_count():
+    """Подзапрос: сколько комментариев у новости на самом деле."""
+    return Coalesce(
+        Subquery(
+            _comments_of_news().values('news').annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        Value(0),
+    )
+
+
+def actual_last_comment_at():
+    """Подзапрос: время последнего комментария новости."""
+    return Subquery(
+        _comments_of_news().order_by('-created').values('created')[:1]
+    )
+
+
+def comment_added(news_id, created):
+    """Один UPDATE без чтения новости: параллельные записи не теряются."""
+    News.objects.filter(pk=news_id).update(
+        comment_count=F('comment_count') + 1,
+        last_comment_at=Greatest(
+            Coalesce('last_comment_at', Value(created)), Value(created)
+        ),
+    )
+
+
+def comment_removed(news_id):
+    News.objects.filter(pk=news_id).update(
+        comment_count=Greatest(F('comment_count') - 1, Value(0)),
+        last_comment_at=actual_last_comment_at(),
+    )
+
+
+def comments_removed(counts):
+    """Вычитает удалённые комментарии: counts — {id новости: сколько}."""
+    if not counts:
+        return 0
+    removed = Case(
+        *(When(pk=pk, then=Value(count)) for pk, count in counts.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return News.objects.filter(pk__in=counts).update(
+        comment_count=Greatest(F('comment_count') - removed, Value(0)),
+        last_comment_at=actual_last_comment_at(),
+    )
+
+
+def is_news_deletion(origin):
+    """Комментарии удаляются вместе со своей новостью."""
+    if isinstance(origin, QuerySet):
+        return origin.model is News
+    return isinstance(origin, News)
+
+
+def recount(queryset):
+    """Пересчитывает счётчики новостей queryset одним UPDATE."""
+    return queryset.update(
+        comment_count=actual_comment_count(),
+        last_comment_at=actual_last_comment_at(),
+    )
+
+
+def mismatches(queryset):
+    """Новости, у которых сохранённые счётчики расходятся с комментариями."""
+    return queryset.annotate(
+        actual_count=actual_comment_count(),
+        actual_last=actual_last_comment_at(),
+    ).filter(
+        ~Q(comment_count=F('actual_count'))
+        # Сравнение с NULL ничего не даёт, такие случаи проверяем отдельно.
+        | Q(last_comment_at__isnull=True, actual_last__isnull=False)
+        | Q(last_comment_at__isnull=False, actual_last__isnull=True)
+        | Q(last_comment_at__lt=F('actual_last'))
+        | Q(last_comment_at__gt=F('actual_last'))
+    )
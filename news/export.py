@@ -0,0 +1,118 @@
+"""Потоковая выгрузка новостей вместе с комментариями."""
+import csv
+import json
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import Q
+
+from .models import Comment, News
+
+FORMATS = ('jsonl', 'csv')
+CHUNK_SIZE = 500
+CSV_FIELDS = (
+    'news_id', 'title', 'date', 'text',
+    'comment_id', 'author', 'comment_text', 'created',
+)
+
+
+class Echo:
+    """Файлоподобный объект: csv.writer отдаёт строку, а не копит её."""
+
+    def write(self, value):
+        return value
+
+
+def iter_news(after=None, chunk_size=CHUNK_SIZE):
+    """
+    Пачки новостей в порядке (date, id), начиная после новости after.
+
+    Каждая пачка выбирается по ключу последней новости предыдущей,
+    поэтому выгрузку можно продолжить с любой новости.
+    """
+    queryset = News.objects.order_by('date', 'pk').values(
+        'pk', 'title', 'date', 'text'
+    )
+    last_date, last_pk = (after.date, after.pk) if after else (None, None)
+    while True:
+        chunk = queryset
+        if last_pk is not None:
+            chunk = chunk.filter(
+                Q(date__gt=last_date) | Q(pk__gt=last_pk),
+                date__gte=last_date,
+            )
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_date, last_pk = chunk[-1]['date'], chunk[-1]['pk']
+
+
+def iter_news_with_comments(after=None, chunk_size=CHUNK_SIZE):
+    """
+    Пары (новость, комментарии новости).
+
+    Комментарии пачки новостей читаются одним потоковым запросом в том же
+    порядке, что и новости, так что в памяти не копится ничего, кроме
+    комментариев текущей новости.
+    """
+    for chunk in iter_news(after, chunk_size):
+        comments = Comment.objects.filter(
+            news_id__in=[news['pk'] for news in chunk]
+        ).order_by('news__date', 'news_id', 'created', 'pk').values(
+            'pk', 'news_id', 'author__username', 'text', 'created'
+        ).iterator(chunk_size=chunk_size)
+        groups = groupby(comments, key=itemgetter('news_id'))
+        news_id, group = next(groups, (None, ()))
+        for news in chunk:
+            if news['pk'] == news_id:
+                yield news, group
+                news_id, group = next(groups, (None, ()))
+            else:
+                yield news, ()
+
+
+def export_jsonl(rows):
+    for news, comments in rows:
+        yield json.dumps({
+            'id': news['pk'],
+            'title': news['title'],
+            'date': news['date'].isoformat(),
+            'text': news['text'],
+            'comments': [
+                {
+                    'id': comment['pk'],
+                    'author': comment['author__username'],
+                    'text': comment['text'],
+                    'created': comment['created'].isoformat(),
+                }
+                for comment in comments
+            ],
+        }, ensure_ascii=False) + '\n'
+
+
+def export_csv(rows):
+    """Строка на каждый комментарий; новость без комментариев — одна строка."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for news, comments in rows:
+        news_fields = (
+            news['pk'], news['title'], news['date'].isoformat(), news['text']
+        )
+        has_comments = False
+        for comment in comments:
+            has_comments = True
+            yield writer.writerow(news_fields + (
+                comment['pk'],
+                comment['author__username'],
+                comment['text'],
+                comment['created'].isoformat(),
+            ))
+        if not has_comments:
+            yield writer.writerow(news_fields + ('',) * 4)
+
+
+def export_lines(file_format, after=None, chunk_size=CHUNK_SIZE):
+    """Генератор строк выгрузки в формате jsonl или csv."""
+    exporter = export_jsonl if file_format == 'jsonl' else export_csv
+    return exporter(iter_news_with_comments(after, chunk_size))
@@ -1,15 +1,21 @@
+from django import forms
 from django.forms import ModelForm
 from django.core.exceptions import ValidationError
 
+from .bulk import DELETE, FLAG
 from .models import Comment
+from .moderation import BannedWords
 
+# Начальный словарь: с ним миграция создаёт записи BannedWord,
+# дальше список редактируется в админке.
 BAD_WORDS = (
     'редиска',
     'негодяй',
-    # Дополните список на своё усмотрение.
 )
 WARNING = 'Не ругайтесь!'
 
+bad_words = BannedWords()
+
 
 class CommentForm(ModelForm):
 
@@ -20,8 +26,36 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if bad_words.search(text):
+            raise ValidationError(WARNING)
         return text
+
+
+class CommentModerationForm(forms.Form):
+    """Фильтры и действие пакетной модерации, см. news.bulk."""
+
+    FILTERS = ('author', 'news', 'since', 'until')
+
+    action = forms.ChoiceField(choices=(
+        (DELETE, 'Удалить'),
+        (FLAG, 'Отметить для проверки'),
+    ))
+    author = forms.CharField(required=False, label='Имя автора')
+    news = forms.IntegerField(required=False, min_value=1, label='id новости')
+    since = forms.DateTimeField(required=False, label='Начиная с')
+    until = forms.DateTimeField(required=False, label='До')
+    banned = forms.BooleanField(
+        required=False, label='Только с запрещёнными словами'
+    )
+
+    def clean(self):
+        """Без фильтров под действие попала бы вся таблица."""
+        data = super().clean()
+        if not data.get('banned') and all(
+            data.get(name) in (None, '') for name in self.FILTERS
+        ):
+            raise ValidationError('Укажите хотя бы один фильтр.')
+        return data
+
+    def filters(self):
+        return {name: self.cleaned_data[name] for name in self.FILTERS}
@@ -0,0 +1,87 @@
+"""Время страниц админки на новости с большим числом комментариев."""
+import io
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from news.management.utils import benchmark_environment
+from news.metrics import QueryCounter, percentile
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт новость с COMMENTS комментариями и NEWS обычных новостей, '
+        'замеряет страницы админки (новость, её комментарии, списки, '
+        'поиск) и завершается ошибкой, если p95 какой-то страницы выше '
+        '--target-ms. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=100_000)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument('--target-ms', type=float, default=500)
+
+    def handle(self, *args, **options):
+        with benchmark_environment():
+            call_command(
+                'seed_news', news=options['news'], comments=1,
+                stdout=io.StringIO(),
+            )
+            call_command(
+                'seed_news', news=1, comments=options['comments'],
+                stdout=io.StringIO(),
+            )
+            busy = News.objects.order_by('-comment_count').first()
+            slow = self.run(busy, options['requests'], options['target_ms'])
+        if slow:
+            raise CommandError(
+                f'p95 выше {options["target_ms"]:.0f} мс: {", ".join(slow)}.'
+            )
+
+    def run(self, busy, requests, target_ms):
+        user = get_user_model().objects.create_superuser(
+            'bench-admin', password='benchmark'
+        )
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        comments_url = reverse('admin:news_comment_changelist')
+        pages = {
+            'новость': reverse('admin:news_news_change', args=(busy.pk,)),
+            'её комментарии': f'{comments_url}?news__id__exact={busy.pk}',
+            'все комментарии': comments_url,
+            'список новостей': reverse('admin:news_news_changelist'),
+            'поиск новостей': (
+                reverse('admin:news_news_changelist')
+                + '?q=' + busy.title.split()[-1]
+            ),
+        }
+        self.stdout.write(
+            f'Комментариев у новости: {busy.comment_count}.\n'
+            f'{"страница":<16} {"p50, мс":>9} {"p95, мс":>9} {"SQL":>5}'
+        )
+        slow = []
+        for name, url in pages.items():
+            client.get(url)
+            timings = []
+            for _ in range(requests):
+                counter = QueryCounter()
+                started = time.perf_counter()
+                with counter.watch():
+                    response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'{url}: ответ {response.status_code}')
+            p95 = percentile(timings, 95)
+            self.stdout.write(
+                f'{name:<16} {percentile(timings, 50):>9.1f} '
+                f'{p95:>9.1f} {counter.count:>5}'
+            )
+            if p95 > target_ms:
+                slow.append(name)
+        return slow
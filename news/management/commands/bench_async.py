@@ -0,0 +1,93 @@
+"""Нагрузочный тест синхронных и асинхронных страниц под ASGI."""
+import asyncio
+import time
+from contextlib import contextmanager
+from itertools import cycle
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from news.management.utils import reload_urlconf
+from news.metrics import percentile
+from news.models import News
+
+
+@contextmanager
+def read_views(use_async):
+    """Переключает маршруты главной и страницы новости."""
+    try:
+        with override_settings(
+            NEWS_ASYNC_READ_VIEWS=use_async,
+            # Адрес, с которым ходит AsyncClient.
+            ALLOWED_HOSTS=['testserver'],
+        ):
+            reload_urlconf()
+            yield
+    finally:
+        reload_urlconf()
+
+
+async def load(urls, requests, concurrency):
+    """Отправляет requests запросов, не больше concurrency одновременно."""
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def fetch(url):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: ответ {response.status_code}')
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        fetch(url) for url, _ in zip(cycle(urls), range(requests))
+    ))
+    return latencies, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет news:home и news:detail через ASGI-обработчик Django '
+        'при разной конкурентности: сначала синхронные представления, '
+        'затем асинхронные. Нужны данные, например из seed_news.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=(1, 10, 50)
+        )
+        parser.add_argument('--news', type=int, default=50)
+
+    def handle(self, *args, **options):
+        news_ids = list(
+            News.objects.values_list('pk', flat=True)[:options['news']]
+        )
+        if not news_ids:
+            raise CommandError('Новостей нет: сначала выполните seed_news.')
+        self.stdout.write(
+            f'{"режим":<8} {"конк.":>6} {"запр./с":>9} '
+            f'{"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9}'
+        )
+        for use_async in (False, True):
+            with read_views(use_async):
+                urls = [reverse('news:home')] + [
+                    reverse('news:detail', args=(pk,)) for pk in news_ids
+                ]
+                for concurrency in options['concurrency']:
+                    latencies, elapsed = asyncio.run(
+                        load(urls, options['requests'], concurrency)
+                    )
+                    self.stdout.write(
+                        f'{"async" if use_async else "sync":<8} '
+                        f'{concurrency:>6} '
+                        f'{len(latencies) / elapsed:>9.0f} '
+                        + ' '.join(
+                            f'{percentile(latencies, p) * 1000:>9.2f}'
+                            for p in (50, 95, 99)
+                        )
+                    )
@@ -0,0 +1,77 @@
+"""Сравнение проверки запрещённых слов: цикл по списку и BadWordMatcher."""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from news.moderation import BadWordMatcher
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def naive_search(words, text):
+    """Прежняя проверка из CommentForm.clean_text."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет проверку комментария на запрещённые слова для списков '
+        'разного размера. Текст не содержит запрещённых слов: '
+        'это худший случай, когда просматривается весь список.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=(10, 1000, 50000)
+        )
+        parser.add_argument(
+            '--text-length', type=int, default=2000,
+            help='Длина комментария в словах.'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        def random_word(low, high):
+            return ''.join(
+                rng.choice(ALPHABET) for _ in range(rng.randint(low, high))
+            )
+
+        # Слова в тексте короче запрещённых, поэтому совпадений нет.
+        text = ' '.join(
+            random_word(2, 4) for _ in range(options['text_length'])
+        )
+        self.stdout.write(
+            f'{"слов":>8} {"цикл, мс":>12} {"матчер, мс":>12} '
+            f'{"компиляция, мс":>16}'
+        )
+        for size in options['sizes']:
+            words = [random_word(5, 12) for _ in range(size)]
+            started = time.perf_counter()
+            matcher = BadWordMatcher(words)
+            compile_time = (time.perf_counter() - started) * 1000
+            naive = measure(lambda: naive_search(words, text),
+                            options['repeat'])
+            compiled = measure(lambda: matcher.search(text),
+                               options['repeat'])
+            self.stdout.write(
+                f'{size:>8} {naive:>12.2f} {compiled:>12.2f} '
+                f'{compile_time:>16.2f}'
+            )
@@ -0,0 +1,183 @@
+"""Одновременная запись комментариев и чтение страниц новостей."""
+import io
+import tempfile
+import threading
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from news.metrics import percentile
+from news.models import News
+
+PROFILE_KEYS = ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS', 'TEST')
+
+
+def hammer(send, urls, requests, expected_status, barrier, result):
+    """
+    Поток бенчмарка: requests запросов по кругу адресов urls.
+
+    После каждого запроса соединения закрываются так же, как по сигналу
+    request_finished в боевом окружении: с CONN_MAX_AGE они живут
+    дольше одного запроса. Ошибки базы считаются, а не прерывают поток.
+    """
+    barrier.wait()
+    try:
+        for url in islice(cycle(urls), requests):
+            started = time.perf_counter()
+            try:
+                response = send(url)
+            except DatabaseError:
+                result['errors'] += 1
+                continue
+            finally:
+                close_old_connections()
+            result['latencies'].append(time.perf_counter() - started)
+            if response.status_code != expected_status:
+                result['errors'] += 1
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Для каждого профиля SQLite из SQLITE_PROFILES создаёт временную '
+        'базу в файле и запускает WRITERS потоков, которые пишут '
+        'комментарии, и READERS потоков, которые читают страницы '
+        'новостей. Выводит пропускную способность, p50/p95/p99 и число '
+        'ошибок («database is locked») по записи и по чтению.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', nargs='+', choices=tuple(settings.SQLITE_PROFILES),
+            default=tuple(settings.SQLITE_PROFILES),
+        )
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Запросов на один поток.',
+        )
+        parser.add_argument('--news', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Бенчмарк сравнивает профили SQLite.')
+        self.stdout.write(
+            f'{"профиль":<12} {"поток":<7} {"запр./с":>9} {"p50, мс":>9} '
+            f'{"p95, мс":>9} {"p99, мс":>9} {"ошибок":>7}'
+        )
+        for profile in options['profile']:
+            for kind, result in self.run(profile, options).items():
+                latencies = result['latencies']
+                self.stdout.write(
+                    f'{profile:<12} {kind:<7} '
+                    f'{len(latencies) / result["elapsed"]:>9.0f} '
+                    + ' '.join(
+                        f'{(percentile(latencies, p) or 0) * 1000:>9.2f}'
+                        for p in (50, 95, 99)
+                    )
+                    + f' {result["errors"]:>7}'
+                )
+
+    def run(self, profile, options):
+        """
+        Замер на отдельной базе с настройками профиля.
+
+        Откат транзакции, как в других бенчмарках, здесь не подходит:
+        потоки работают через свои соединения и не видят чужих
+        незафиксированных данных. Поэтому база создаётся во временном
+        файле тем же способом, что и тестовая, и удаляется после замера.
+        """
+        connection = connections['default']
+        saved = {key: connection.settings_dict[key] for key in PROFILE_KEYS}
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            DEBUG=False,
+            QUERY_BUDGET_LOGGING=False,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': f'concurrency-{profile}',
+            }},
+        ):
+            connections.close_all()
+            connection.settings_dict.update(settings.SQLITE_PROFILES[profile])
+            connection.settings_dict['TEST'] = {
+                **saved['TEST'], 'NAME': str(Path(directory) / 'bench.db'),
+            }
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                return self.measure(options)
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                connection.settings_dict.update(saved)
+
+    def measure(self, options):
+        call_command(
+            'seed_news', news=options['news'], comments=options['news'],
+            stdout=io.StringIO(),
+        )
+        urls = [
+            reverse('news:detail', args=(pk,))
+            for pk in News.objects.values_list('pk', flat=True)
+        ]
+        if not urls:
+            raise CommandError('Нужна хотя бы одна новость: --news 1.')
+        writers = []
+        for index in range(options['writers']):
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(get_user_model().objects.create_user(
+                f'bench-writer-{index}'
+            ))
+            writers.append(client)
+        connections.close_all()
+        barrier = threading.Barrier(options['writers'] + options['readers'])
+        results = {'запись': [], 'чтение': []}
+        threads = []
+        for kind, count in (
+            ('запись', options['writers']), ('чтение', options['readers'])
+        ):
+            for index in range(count):
+                result = {'latencies': [], 'errors': 0}
+                results[kind].append(result)
+                if kind == 'запись':
+                    client = writers[index]
+
+                    def send(url, client=client):
+                        return client.post(url, {'text': 'Комментарий'})
+
+                    expected_status = 302
+                else:
+                    send = Client(HTTP_HOST='localhost').get
+                    expected_status = 200
+                threads.append(threading.Thread(target=hammer, args=(
+                    send, urls, options['requests'], expected_status,
+                    barrier, result,
+                )))
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {
+            kind: {
+                'latencies': [
+                    latency for result in kind_results
+                    for latency in result['latencies']
+                ],
+                'errors': sum(result['errors'] for result in kind_results),
+                'elapsed': elapsed,
+            }
+            for kind, kind_results in results.items()
+        }
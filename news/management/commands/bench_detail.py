@@ -0,0 +1,82 @@
+"""Микробенчмарк диспетчеризации страницы новости."""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import path, reverse
+from django.views import generic
+
+from news.management.utils import benchmark_environment
+from news.models import News
+from news.views import NewsComment, NewsDetail
+from yanews.urls import urlpatterns as site_urlpatterns
+
+
+class PerRequestNewsDetailView(generic.View):
+    """Прежний вариант: представления собираются на каждый запрос."""
+
+    def get(self, request, *args, **kwargs):
+        view = NewsDetail.as_view()
+        return view(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        view = NewsComment.as_view()
+        return view(request, *args, **kwargs)
+
+
+# Команда сама служит ROOT_URLCONF: к маршрутам сайта добавлен
+# маршрут с прежним вариантом представления.
+urlpatterns = site_urlpatterns + [
+    path(
+        'per-request/news/<int:pk>/',
+        PerRequestNewsDetailView.as_view(),
+        name='per_request_detail',
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запросов в секунду на news:detail (GET и POST) '
+        'у представлений, собранных при импорте, и у собираемых на каждый '
+        'запрос. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with override_settings(ROOT_URLCONF=__name__), \
+                benchmark_environment():
+            self.run(options['requests'], options['rounds'])
+
+    def run(self, requests, rounds):
+        news = News.objects.create(title='Бенчмарк', text='Текст')
+        user = get_user_model().objects.create_user('bench-detail')
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        urls = {
+            'при импорте': reverse('news:detail', args=(news.pk,)),
+            'на запрос': reverse('per_request_detail', args=(news.pk,)),
+        }
+        best = {}
+        # Варианты чередуются, чтобы прогрев и шум влияли на оба одинаково.
+        # GET идут раньше POST: каждый POST сбрасывает кэш страницы.
+        for _ in range(rounds):
+            for method in ('GET', 'POST'):
+                for variant, url in urls.items():
+                    started = time.perf_counter()
+                    for _ in range(requests):
+                        if method == 'GET':
+                            client.get(url)
+                        else:
+                            client.post(url, {'text': 'Комментарий'})
+                    rps = requests / (time.perf_counter() - started)
+                    key = (variant, method)
+                    best[key] = max(best.get(key, 0), rps)
+        for (variant, method), rps in sorted(best.items()):
+            self.stdout.write(
+                f'{method:<5} {variant:<12} {rps:>10.0f} запр./с'
+            )
@@ -0,0 +1,114 @@
+"""Задержка поиска на большом числе новостей."""
+import random
+import time
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from news.management.utils import batched, benchmark_environment
+from news.metrics import percentile
+from news.models import News
+from news.search import python_index, search
+
+SYLLABLES = (
+    'ба', 'ве', 'го', 'ду', 'жи', 'за', 'ки', 'ло', 'ма', 'но',
+    'пе', 'ра', 'су', 'те', 'фо', 'ха', 'це', 'чу', 'ша', 'ют',
+)
+
+
+def vocabulary(rng, size):
+    """Уникальные слова; частота слова убывает с рангом, как в языке."""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт NEWS новостей из синтетического словаря и замеряет '
+        'p50/p95/p99 поиска для частого, среднего и редкого слова и пары '
+        'слов. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=1_000_000)
+        parser.add_argument('--words', type=int, default=20_000)
+        parser.add_argument('--text-words', type=int, default=60)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--backend', choices=('fts5', 'python'), nargs='+',
+            default=('fts5',),
+            help='Индекс в памяти на миллионе новостей занимает гигабайты.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = vocabulary(rng, options['words'])
+        # Закон Ципфа: вес слова обратно пропорционален его рангу.
+        weights = [1 / rank for rank in range(1, len(words) + 1)]
+        queries = {
+            'частое': words[0],
+            'среднее': words[len(words) // 100],
+            'редкое': words[len(words) // 2],
+            'два слова': f'{words[1]} {words[len(words) // 100]}',
+        }
+        with benchmark_environment():
+            started = time.perf_counter()
+            self.create_news(rng, words, weights, options)
+            self.stdout.write(
+                f'Новостей: {options["news"]} '
+                f'за {time.perf_counter() - started:.1f} с.'
+            )
+            for backend in options['backend']:
+                with override_settings(NEWS_SEARCH_BACKEND=backend):
+                    self.run(backend, queries, options['repeat'])
+        python_index.reset()
+
+    def create_news(self, rng, words, weights, options):
+        cum_weights = list(accumulate(weights))
+        news = (
+            News(
+                title=' '.join(
+                    rng.choices(words, cum_weights=cum_weights, k=5)
+                ).capitalize()[:50],
+                text=' '.join(rng.choices(
+                    words, cum_weights=cum_weights, k=options['text_words']
+                )) + '.',
+            )
+            for _ in range(options['news'])
+        )
+        for batch in batched(news, options['batch_size']):
+            News.objects.bulk_create(batch)
+
+    def run(self, backend, queries, repeat):
+        if backend == 'python':
+            started = time.perf_counter()
+            python_index.reset()
+            python_index.refresh()
+            self.stdout.write(
+                f'python: индекс построен за '
+                f'{time.perf_counter() - started:.1f} с, '
+                f'слов {len(python_index.postings)}.'
+            )
+        self.stdout.write(
+            f'{"движок":<8} {"запрос":<10} {"p50, мс":>9} '
+            f'{"p95, мс":>9} {"p99, мс":>9}'
+        )
+        for name, query in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                search(query, page=1)
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f'{backend:<8} {name:<10} ' + ' '.join(
+                    f'{percentile(timings, p) * 1000:>9.2f}'
+                    for p in (50, 95, 99)
+                )
+            )
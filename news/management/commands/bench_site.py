@@ -0,0 +1,289 @@
+"""Воспроизводимый бенчмарк основных сценариев сайта."""
+import io
+import json
+import platform
+import time
+import tracemalloc
+from functools import partial
+from itertools import cycle
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from news.management.utils import benchmark_environment
+from news.metrics import FetchedBytes, QueryCounter, percentile
+from news.models import Comment, News
+
+BENCH_USERNAME = 'bench-site'
+BENCH_PASSWORD = 'benchmark'
+
+
+def measure(send, urls, requests, expected_status, memory=False):
+    """
+    Отправляет requests запросов по кругу адресов urls.
+
+    Возвращает пропускную способность, процентили задержки в миллисекундах,
+    медианные число SQL-запросов и объём прочитанных из базы байт на ответ
+    (первые ответы сценария заполняют кэши и читают больше; путь без кэша
+    замеряет cold_queries). С memory
+    ещё и медиану пикового прироста памяти за запрос в килобайтах.
+    """
+    latencies = []
+    queries = []
+    fetched = []
+    peaks = []
+    started = time.perf_counter()
+    for url, _ in zip(cycle(urls), range(requests)):
+        counter = QueryCounter()
+        fetched_bytes = FetchedBytes()
+        if memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        request_started = time.perf_counter()
+        with counter.watch(), fetched_bytes.watch():
+            response = send(url)
+        latencies.append(time.perf_counter() - request_started)
+        if memory:
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        queries.append(counter.count)
+        fetched.append(fetched_bytes.total)
+        if response.status_code != expected_status:
+            raise CommandError(f'{url}: ответ {response.status_code}')
+    elapsed = time.perf_counter() - started
+    result = {
+        'requests': requests,
+        'rps': round(requests / elapsed, 1),
+        **{
+            f'p{percent}': round(percentile(latencies, percent) * 1000, 3)
+            for percent in (50, 95, 99)
+        },
+        'queries': percentile(queries, 50),
+        'db_bytes': percentile(fetched, 50),
+    }
+    if memory:
+        result['memory_kb'] = round(percentile(peaks, 50) / 1024, 1)
+    return result
+
+
+def cold_queries(send, urls):
+    """
+    Наибольшее число SQL-запросов на ответ при пустом кэше.
+
+    После прогрева страницы чтения отдаются из кэша, и медиана запросов
+    равна нулю: регрессию на пути без кэша видно только здесь.
+    """
+    counts = []
+    for url in urls:
+        cache.clear()
+        counter = QueryCounter()
+        with counter.watch():
+            send(url)
+        counts.append(counter.count)
+    return max(counts)
+
+
+def compare(report, baseline, tolerance):
+    """Список регрессий отчёта report относительно baseline."""
+    if report['dataset'] != baseline['dataset']:
+        raise CommandError(
+            'Наборы данных отчёта и базового замера различаются: '
+            f'{report["dataset"]} и {baseline["dataset"]}.'
+        )
+    regressions = []
+    for name, base in baseline['scenarios'].items():
+        current = report['scenarios'].get(name)
+        if current is None:
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: SQL-запросов {current["queries"]} '
+                f'вместо {base["queries"]}'
+            )
+        if current.get('cold_queries', 0) > base.get('cold_queries', 0):
+            regressions.append(
+                f'{name}: SQL-запросов без кэша {current["cold_queries"]} '
+                f'вместо {base.get("cold_queries", 0)}'
+            )
+        if current['p95'] > base['p95'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {current["p95"]:.2f} мс '
+                f'вместо {base["p95"]:.2f} мс'
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт набор данных (NEWS новостей, по COMMENTS комментариев, '
+        'USERS пользователей), прогоняет через тестовый клиент главную, '
+        'страницу новости, создание, правку и удаление комментария и вход, '
+        'и пишет пропускную способность, p50/p95/p99 и число SQL-запросов '
+        '(для страниц чтения — и при пустом кэше) в JSON. С --compare '
+        'сверяет отчёт с базовым и завершается ошибкой при регрессии. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=100)
+        parser.add_argument(
+            '--comments', type=int, default=10,
+            help='Количество комментариев к каждой новости.'
+        )
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument(
+            '--login-requests', type=int, default=20,
+            help='Вход считает хеш пароля, поэтому запросов меньше.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=20,
+            help='Незамеряемые запросы перед каждым сценарием чтения.'
+        )
+        parser.add_argument(
+            '--text-size', type=int, default=0,
+            help='Длина текста каждой новости в символах (крупные статьи).'
+        )
+        parser.add_argument(
+            '--memory', action='store_true',
+            help=(
+                'Замерить пик памяти на запрос через tracemalloc; '
+                'задержки при этом не сравнимы с обычным прогоном.'
+            ),
+        )
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+        parser.add_argument('--compare', help='JSON-отчёт базового замера.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базового замера.'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        dataset = {
+            name: options[name]
+            for name in ('news', 'comments', 'users', 'text_size')
+        }
+        with benchmark_environment():
+            call_command(
+                'seed_news', news=options['news'],
+                comments=options['comments'], users=options['users'],
+                seed=options['seed'], stdout=io.StringIO(),
+            )
+            if options['text_size']:
+                News.objects.update(text='Текст статьи. ' * (
+                    options['text_size'] // len('Текст статьи. ') + 1
+                ))
+            if options['memory']:
+                tracemalloc.start()
+            try:
+                scenarios = self.run(options)
+            finally:
+                tracemalloc.stop()
+        report = {
+            'dataset': dataset,
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'scenarios': scenarios,
+        }
+        self.stdout.write(
+            f'{"сценарий":<16} {"запр./с":>9} '
+            f'{"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} {"SQL":>5} '
+            f'{"SQL без кэша":>12} {"из базы, КБ":>12}'
+            + (f' {"память, КБ":>11}' if options['memory'] else '')
+        )
+        for name, result in scenarios.items():
+            self.stdout.write(
+                f'{name:<16} {result["rps"]:>9.0f} {result["p50"]:>9.2f} '
+                f'{result["p95"]:>9.2f} {result["p99"]:>9.2f} '
+                f'{result["queries"]:>5} '
+                f'{result.get("cold_queries", "—"):>12} '
+                f'{result["db_bytes"] / 1024:>12.1f}'
+                + (
+                    f' {result["memory_kb"]:>11.1f}'
+                    if options['memory'] else ''
+                )
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if baseline is not None:
+            regressions = compare(report, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def run(self, options):
+        requests = options['requests']
+        measure_ = partial(measure, memory=options['memory'])
+        # Сотрудник редакции: нужен и для сценария админки.
+        user = get_user_model().objects.create_superuser(
+            BENCH_USERNAME, password=BENCH_PASSWORD
+        )
+        news_urls = [
+            reverse('news:detail', args=(pk,))
+            for pk in News.objects.values_list('pk', flat=True)[:50]
+        ]
+        if not news_urls:
+            raise CommandError('Нужна хотя бы одна новость: --news 1.')
+        anonymous = Client(HTTP_HOST='localhost')
+        reader = Client(HTTP_HOST='localhost')
+        reader.force_login(user)
+
+        def read(client, urls):
+            cold = cold_queries(client.get, urls)
+            for url, _ in zip(cycle(urls), range(options['warmup'])):
+                client.get(url)
+            return {
+                **measure_(client.get, urls, requests, 200),
+                'cold_queries': cold,
+            }
+
+        scenarios = {
+            'home': read(anonymous, [reverse('news:home')]),
+            'detail': read(anonymous, news_urls),
+            'detail_auth': read(reader, news_urls),
+            'admin_news': read(
+                reader, [reverse('admin:news_news_changelist')]
+            ),
+            'comment_create': measure_(
+                lambda url: reader.post(url, {'text': 'Комментарий'}),
+                news_urls, requests, 302,
+            ),
+        }
+        comment_ids = list(
+            Comment.objects.filter(author=user).values_list('pk', flat=True)
+        )
+        scenarios['comment_edit_page'] = read(reader, [
+            reverse('news:edit', args=(pk,)) for pk in comment_ids
+        ])
+        scenarios['comment_edit'] = measure_(
+            lambda url: reader.post(url, {'text': 'Исправленный'}),
+            [reverse('news:edit', args=(pk,)) for pk in comment_ids],
+            requests, 302,
+        )
+        scenarios['comment_delete'] = measure_(
+            reader.post,
+            [reverse('news:delete', args=(pk,)) for pk in comment_ids],
+            requests, 302,
+        )
+        login = Client(HTTP_HOST='localhost')
+        scenarios['login'] = measure_(
+            lambda url: login.post(url, {
+                'username': BENCH_USERNAME, 'password': BENCH_PASSWORD,
+            }),
+            [reverse('users:login')], options['login_requests'], 302,
+        )
+        return scenarios
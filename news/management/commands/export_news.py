@@ -0,0 +1,42 @@
+"""Выгрузка всех новостей с комментариями."""
+from django.core.management.base import BaseCommand, CommandError
+
+from news.export import CHUNK_SIZE, FORMATS, export_lines
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает новости в порядке даты вместе с комментариями '
+        'в формате JSON Lines или CSV. Выгрузку можно продолжить '
+        'с места обрыва, передав id последней выгруженной новости.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--after', type=int,
+            help='id новости, после которой продолжить выгрузку.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            '--output', default='-',
+            help='Путь к файлу; по умолчанию стандартный вывод.'
+        )
+
+    def handle(self, *args, **options):
+        after = None
+        if options['after'] is not None:
+            try:
+                after = News.objects.only('date').get(pk=options['after'])
+            except News.DoesNotExist:
+                raise CommandError(f'Новости {options["after"]} нет.')
+        lines = export_lines(options['format'], after, options['chunk_size'])
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(
+            options['output'], 'w', encoding='utf-8', newline=''
+        ) as output:
+            output.writelines(lines)
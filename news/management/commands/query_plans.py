@@ -0,0 +1,50 @@
+"""Планы и время основных запросов сайта."""
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from news.models import Comment, News
+from news.pagination import encode_cursor, get_comment_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает EXPLAIN и медианное время запросов главной страницы, '
+        'страницы новости и проверки автора комментария. '
+        'Для сравнения «до/после» запустите команду на данных из seed_news '
+        'после `migrate news 0001` и после `migrate news`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        news = News.objects.order_by('-comment_count').first()
+        if news is None:
+            raise CommandError('База пуста: сначала выполните seed_news.')
+        comment = Comment.objects.filter(news=news).order_by('pk').first()
+        size = settings.COMMENT_COUNT_ON_DETAIL_PAGE
+        queries = {
+            'home': News.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE],
+            'detail_first_page': get_comment_queryset(news.pk)[:size + 1],
+            'detail_next_page': (
+                get_comment_queryset(news.pk, encode_cursor(comment))
+                [:size + 1]
+            ),
+            'comment_by_author': Comment.objects.filter(
+                author_id=comment.author_id, pk=comment.pk
+            ),
+        }
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain())
+            self.stdout.write(
+                f'медиана: {statistics.median(timings) * 1000:.2f} мс\n'
+            )
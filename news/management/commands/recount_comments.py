@@ -0,0 +1,72 @@
+"""Пересчёт хранимых в News счётчиков комментариев."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from news.cache import bump_content_version
+from news.counters import mismatches, recount
+from news.models import News
+
+# Сколько расхождений показать при проверке.
+SHOWN_MISMATCHES = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает comment_count и last_comment_at всех новостей '
+        'по таблице комментариев. С --check только ищет расхождения '
+        'и завершается ошибкой, если они есть.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Ничего не менять, только сообщить о расхождениях.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['check']:
+            return self.check_counters()
+        updated = 0
+        for first, last in self.id_ranges(options['batch_size']):
+            # Короткие транзакции не держат базу заблокированной надолго.
+            with transaction.atomic():
+                updated += recount(
+                    News.objects.filter(pk__gte=first, pk__lte=last)
+                )
+        bump_content_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны счётчики новостей: {updated}.'
+        ))
+
+    def id_ranges(self, batch_size):
+        """Границы пачек по id, выбранные по ключу, без OFFSET."""
+        ids = News.objects.order_by('pk').values_list('pk', flat=True)
+        last = None
+        while True:
+            batch = ids if last is None else ids.filter(pk__gt=last)
+            batch = list(batch[:batch_size])
+            if not batch:
+                return
+            yield batch[0], batch[-1]
+            last = batch[-1]
+
+    def check_counters(self):
+        wrong = mismatches(News.objects.order_by('pk'))
+        total = wrong.count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        for news in wrong.values(
+            'pk', 'comment_count', 'actual_count',
+            'last_comment_at', 'actual_last',
+        )[:SHOWN_MISMATCHES]:
+            self.stdout.write(
+                f'{news["pk"]}: комментариев {news["comment_count"]} '
+                f'вместо {news["actual_count"]}, последний '
+                f'{news["last_comment_at"]} вместо {news["actual_last"]}'
+            )
+        raise CommandError(
+            f'Счётчики расходятся у новостей: {total}. '
+            'Исправьте их командой recount_comments.'
+        )
@@ -0,0 +1,44 @@
+"""Пересчёт рейтингов лент, для запуска по расписанию."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.models import Comment, CommentActivity
+from news.ranking import (
+    FEEDS, prune_activity, rebuild_activity, refresh_ranking, window_start
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги лент «самое обсуждаемое» и «недавно '
+        'обсуждали» и кладёт их в кэш. Удобно запускать по расписанию '
+        'чаще, чем истекает NEWS_RANKING_TIMEOUT: тогда читатели никогда '
+        'не ждут пересчёта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Удалить почасовые счётчики, вышедшие из окна.'
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help=(
+                'Заново посчитать почасовые счётчики окна по комментариям, '
+                'например после первого развёртывания.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            since = window_start()
+            with transaction.atomic():
+                CommentActivity.objects.filter(hour__gte=since).delete()
+                rebuild_activity(Comment.objects.filter(created__gte=since))
+        if options['prune']:
+            self.stdout.write(f'Удалено счётчиков: {prune_activity()}.')
+        for feed in FEEDS:
+            ranking = refresh_ranking(feed)
+            self.stdout.write(self.style.SUCCESS(
+                f'{feed}: новостей в ленте {len(ranking.news_ids)}.'
+            ))
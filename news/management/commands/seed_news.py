@@ -0,0 +1,116 @@
+"""Наполнение базы синтетическими данными для замеров производительности."""
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from news.counters import recount
+from news.management.utils import batched
+from news.models import Comment, News, make_excerpt
+from news.ranking import rebuild_activity
+
+User = get_user_model()
+
+
+@contextmanager
+def explicit_created():
+    """
+    Позволяет задать Comment.created вручную.
+
+    Поле объявлено с auto_now_add, и bulk_create перезаписал бы время
+    создания текущим моментом: все комментарии оказались бы «свежими».
+    """
+    field = Comment._meta.get_field('created')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт NEWS новостей, по COMMENTS комментариев к каждой '
+        'и USERS пользователей-комментаторов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=100)
+        parser.add_argument(
+            '--comments', type=int, default=10,
+            help='Количество комментариев к каждой новости.'
+        )
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--password', default='benchmark',
+            help='Пароль создаваемых пользователей.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+        # Метка прогона, чтобы повторный запуск не упирался в уникальность.
+        run = uuid.uuid4().hex[:8]
+        password = make_password(options['password'])
+        users = [
+            User(username=f'reader-{run}-{index}', password=password)
+            for index in range(max(options['users'], 1))
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        author_ids = list(
+            User.objects.filter(
+                username__startswith=f'reader-{run}-'
+            ).values_list('pk', flat=True)
+        )
+        today = timezone.localdate()
+
+        def make_news(index):
+            text = f'Текст новости №{index}. ' * 20
+            return News(
+                title=f'Новость {run} №{index}',
+                text=text,
+                excerpt=make_excerpt(text),
+                date=today - timedelta(days=index),
+            )
+
+        news = (make_news(index) for index in range(options['news']))
+        news_ids = []
+        for batch in batched(news, batch_size):
+            with transaction.atomic():
+                News.objects.bulk_create(batch)
+            news_ids += [item.pk for item in batch]
+        now = timezone.now()
+        comments = (
+            Comment(
+                news_id=news_id,
+                author_id=rng.choice(author_ids),
+                text=f'Комментарий №{index}',
+                created=now - timedelta(seconds=rng.randrange(30 * 86400)),
+            )
+            for news_id in news_ids
+            for index in range(options['comments'])
+        )
+        with explicit_created():
+            for batch in batched(comments, batch_size):
+                with transaction.atomic():
+                    Comment.objects.bulk_create(batch)
+        # bulk_create не отправляет сигналы, счётчики считаем сами.
+        for batch in batched(news_ids, batch_size):
+            recount(News.objects.filter(pk__in=batch))
+            rebuild_activity(Comment.objects.filter(news_id__in=batch))
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: новостей {len(news_ids)}, '
+            f'комментариев {len(news_ids) * options["comments"]}, '
+            f'пользователей {len(author_ids)} '
+            f'за {time.perf_counter() - started:.1f} с.'
+        ))
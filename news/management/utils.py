@@ -0,0 +1,45 @@
+import importlib
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import transaction
+from django.test import override_settings
+from django.urls import clear_url_caches
+
+
+def batched(iterable, size):
+    """Нарезает итератор на списки длиной не больше size."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def reload_urlconf():
+    """Перечитывает маршруты после смены NEWS_ASYNC_READ_VIEWS."""
+    import news.urls
+    import yanews.urls
+    importlib.reload(news.urls)
+    importlib.reload(yanews.urls)
+    clear_url_caches()
+
+
+@contextmanager
+def benchmark_environment():
+    """
+    Окружение бенчмарка: всё записанное в базу откатывается.
+
+    Кэш на время замера подменяется отдельным кэшем в памяти, чтобы
+    отрисованные страницы с откаченными данными не попали в общий кэш.
+    Отладочный журнал запросов выключен, как в боевом окружении, а число
+    запросов бенчмарки считают сами и превышения бюджета не журналируют.
+    """
+    with override_settings(
+        DEBUG=False,
+        QUERY_BUDGET_LOGGING=False,
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmark',
+        }},
+    ), transaction.atomic():
+        yield
+        transaction.set_rollback(True)
@@ -0,0 +1,174 @@
+"""Замеры SQL-запросов и времени ответа."""
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга; для пустой выборки — None."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+def describe(values):
+    return {
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values, default=None),
+    }
+
+
+_current_counter = ContextVar('query_counter', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Обёртка выполнения запросов, подключаемая к каждому соединению.
+
+    Счётчик берётся из контекстной переменной: она переходит и в потоки,
+    где sync_to_async выполняет запросы асинхронных представлений.
+    Запрос учитывается и во всех объемлющих счётчиках.
+    """
+    counter = _current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        while counter is not None:
+            counter.count += 1
+            counter.duration += duration
+            counter = counter.parent
+
+
+class QueryCounter:
+    """Число запросов и их суммарное время внутри watch()."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.parent = None
+
+    @contextmanager
+    def watch(self):
+        self.parent = _current_counter.get()
+        token = _current_counter.set(self)
+        try:
+            yield self
+        finally:
+            _current_counter.reset(token)
+
+
+def _row_size(row):
+    return sum(
+        len(value.encode()) if isinstance(value, str)
+        else len(value) if isinstance(value, bytes)
+        else 8
+        for value in row if value is not None
+    )
+
+
+class _CountingCursor:
+    """Курсор базы, считающий объём прочитанных строк."""
+
+    def __init__(self, cursor, counter):
+        self.cursor = cursor
+        self.counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        for row in self.cursor:
+            self.counter.total += _row_size(row)
+            yield row
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.counter.total += _row_size(row)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self.cursor.fetchmany(*args)
+        self.counter.total += sum(map(_row_size, rows))
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        self.counter.total += sum(map(_row_size, rows))
+        return rows
+
+
+class FetchedBytes:
+    """
+    Примерный объём данных, прочитанных из базы внутри watch().
+
+    Строки считаются в UTF-8, числа и даты — по 8 байт. Для замеров:
+    каждая прочитанная строка проходит через Python-обёртку.
+    """
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        wrapper = context['cursor']
+        if not isinstance(wrapper.cursor, _CountingCursor):
+            wrapper.cursor = _CountingCursor(wrapper.cursor, self)
+        return result
+
+    @contextmanager
+    def watch(self):
+        with connection.execute_wrapper(self):
+            yield self
+
+
+class RequestStats:
+    """Последние замеры для каждого имени маршрута."""
+
+    def __init__(self, sample_size):
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._samples = defaultdict(
+                lambda: deque(maxlen=self.sample_size)
+            )
+
+    def add(self, view_name, queries, db_time, wall_time):
+        with self._lock:
+            self._samples[view_name].append((queries, db_time, wall_time))
+
+    def summary(self):
+        """Процентили числа запросов, времени в базе и полного времени."""
+        with self._lock:
+            samples = {
+                name: list(values) for name, values in self._samples.items()
+            }
+        return {
+            name: {
+                'requests': len(values),
+                'queries': describe([value[0] for value in values]),
+                'db_ms': describe([value[1] * 1000 for value in values]),
+                'wall_ms': describe([value[2] * 1000 for value in values]),
+            }
+            for name, values in samples.items()
+        }
+
+
+request_stats = RequestStats(settings.QUERY_STATS_SAMPLE_SIZE)
@@ -0,0 +1,111 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import QueryCounter, request_stats
+from .routers import routing
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'TRACE'})
+
+
+class QueryStatsMiddleware:
+    """
+    Число SQL-запросов, время в базе и полное время ответа по маршрутам.
+
+    Стоит поставить в начало MIDDLEWARE, чтобы в замер попадали
+    и запросы сессий и пользователей. У потоковых ответов учитывается
+    только время до отдачи первого байта. Работает и под ASGI, не
+    переводя асинхронные представления в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with counter.watch():
+            response = self.get_response(request)
+        self.record(request, counter, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with counter.watch():
+            response = await self.get_response(request)
+        self.record(request, counter, time.perf_counter() - started)
+        return response
+
+    def record(self, request, counter, wall_time):
+        match = request.resolver_match
+        if match is None:
+            return
+        view_name = match.view_name
+        request_stats.add(
+            view_name, counter.count, counter.duration, wall_time
+        )
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if (
+            settings.QUERY_BUDGET_LOGGING
+            and budget is not None
+            and counter.count > budget
+        ):
+            logger.warning(
+                '%s %s: %d SQL-запросов при бюджете %d (%.1f мс в базе)',
+                request.method, request.path, counter.count, budget,
+                counter.duration * 1000,
+            )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Направляет чтение новостей и комментариев на реплику.
+
+    Изменяющий запрос целиком идёт в основную базу и ставит cookie:
+    пока она жива, запросы пользователя тоже читают с основной базы.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing(self.pinned(request)):
+            response = self.get_response(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        with routing(self.pinned(request)):
+            response = await self.get_response(request)
+        return self.pin(request, response)
+
+    def pinned(self, request):
+        return (
+            request.method not in SAFE_METHODS
+            or settings.NEWS_PRIMARY_COOKIE in request.COOKIES
+        )
+
+    def pin(self, request, response):
+        if settings.NEWS_READ_REPLICAS and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                settings.NEWS_PRIMARY_COOKIE, '1',
+                max_age=settings.NEWS_REPLICA_LAG,
+                httponly=True, samesite='Lax',
+            )
+        return response
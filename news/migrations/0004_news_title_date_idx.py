@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_bannedword'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['title', 'date'], name='news_title_date_idx'),
+        ),
+    ]
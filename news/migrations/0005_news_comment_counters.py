@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    Comment = apps.get_model('news', 'Comment')
+    alias = schema_editor.connection.alias
+    comments = Comment.objects.filter(news=OuterRef('pk')).order_by()
+    News.objects.using(alias).update(
+        comment_count=Coalesce(
+            Subquery(
+                comments.values('news').annotate(
+                    count=Count('pk')
+                ).values('count')
+            ),
+            Value(0),
+        ),
+        last_comment_at=Subquery(
+            comments.order_by('-created').values('created')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_news_title_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='last_comment_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Последний комментарий'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_news_comment_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-last_comment_at'], name='news_last_comment_idx'),
+        ),
+        migrations.AddField(
+            model_name='commentactivity',
+            name='news',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.news'),
+        ),
+        migrations.AddIndex(
+            model_name='commentactivity',
+            index=models.Index(fields=['hour'], name='comment_activity_hour_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='commentactivity',
+            constraint=models.UniqueConstraint(fields=('news', 'hour'), name='comment_activity_news_hour'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+from news.models import make_excerpt
+
+BATCH_SIZE = 1000
+
+
+def fill_excerpts(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    alias = schema_editor.connection.alias
+    queryset = News.objects.using(alias).only('text').order_by('pk')
+    last_pk = 0
+    while batch := list(queryset.filter(pk__gt=last_pk)[:BATCH_SIZE]):
+        for news in batch:
+            news.excerpt = make_excerpt(news.text)
+        News.objects.using(alias).bulk_update(batch, ('excerpt',))
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_news_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=500, verbose_name='Анонс'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_news_excerpt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='is_flagged',
+            field=models.BooleanField(default=False, editable=False, verbose_name='На проверке'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_flagged', True)), fields=['id'], name='comment_flagged_idx'),
+        ),
+    ]
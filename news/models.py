@@ -1,22 +1,77 @@
 from datetime import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils.text import Truncator
+
+# Анонс новости на главной странице: столько первых слов текста.
+EXCERPT_WORDS = 15
+EXCERPT_MAX_LENGTH = 500
+# Поля, которые поддерживает news.counters, а не save().
+COUNTER_FIELDS = ('comment_count', 'last_comment_at')
+
+
+def make_excerpt(text):
+    """Первые слова текста; длинные «слова» обрезаются по символам."""
+    return Truncator(text).words(EXCERPT_WORDS)[:EXCERPT_MAX_LENGTH]
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    # Вычисляется сигналом pre_save (news.signals), который срабатывает
+    # и для loaddata: главной странице не нужен весь текст.
+    excerpt = models.CharField(
+        'Анонс', max_length=EXCERPT_MAX_LENGTH, blank=True, editable=False
+    )
+    # Поддерживаются сигналами комментариев, см. news.counters.
+    comment_count = models.PositiveIntegerField(
+        'Комментариев', default=0, editable=False
+    )
+    last_comment_at = models.DateTimeField(
+        'Последний комментарий', null=True, editable=False
+    )
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            # Главная страница: несколько последних новостей по дате.
+            models.Index(fields=('-date',), name='news_date_idx'),
+            # Поиск дублей при пакетной загрузке новостей.
+            models.Index(fields=('title', 'date'), name='news_title_date_idx'),
+            # Лента «недавно обсуждали».
+            models.Index(
+                fields=('-last_comment_at',), name='news_last_comment_idx'
+            ),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if (
+            update_fields is None
+            and not self._state.adding
+            and self.pk is not None
+            and not kwargs.get('force_insert')
+        ):
+            # Счётчики меняют только UPDATE с F() из news.counters:
+            # полное сохранение устаревшего объекта (правка в админке,
+            # новость из кэша) не должно их затирать. Копия через
+            # pk = None и явная вставка сохраняются целиком.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in COUNTER_FIELDS
+            ]
+        elif update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -29,9 +84,66 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    # Ставит пакетная модерация (news.bulk): комментарий ждёт проверки.
+    is_flagged = models.BooleanField(
+        'На проверке', default=False, editable=False
+    )
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            # Комментарии одной новости в порядке (created, id):
+            # и вывод на странице новости, и постраничная подгрузка.
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx'
+            ),
+            # Очередь проверки в админке: отмеченных обычно единицы.
+            models.Index(
+                fields=('id',),
+                condition=models.Q(is_flagged=True),
+                name='comment_flagged_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    def save(self, *args, **kwargs):
+        # Счётчики новости обновляются в post_save и должны
+        # зафиксироваться вместе с самим комментарием.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class CommentActivity(models.Model):
+    """Число комментариев новости за один час, см. news.ranking."""
+    news = models.ForeignKey(News, on_delete=models.CASCADE)
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('news', 'hour'), name='comment_activity_news_hour'
+            ),
+        )
+        indexes = (
+            # Сумма по часам скользящего окна и очистка старых часов.
+            models.Index(fields=('hour',), name='comment_activity_hour_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.news_id} {self.hour:%Y-%m-%d %H}: {self.count}'
+
+
+class BannedWord(models.Model):
+    word = models.CharField('Слово', max_length=100, unique=True)
+
+    class Meta:
+        ordering = ('word',)
+        verbose_name_plural = 'Запрещённые слова'
+        verbose_name = 'Запрещённое слово'
+
+    def __str__(self):
+        return self.word
@@ -0,0 +1,101 @@
+"""Поиск запрещённых слов в тексте комментария."""
+import re
+import threading
+
+from .cache import get_banned_words_version
+from .models import BannedWord
+
+
+def _build_trie(words):
+    """
+    Префиксное дерево слов: узел — словарь «буква -> потомок».
+
+    Конец слова помечается потомком None. Слово, которое начинается
+    с уже запрещённого, ничего не добавляет к поиску, поэтому слова
+    вставляются от коротких к длинным и такие продолжения отбрасываются.
+    """
+    trie = {}
+    for word in sorted(words, key=len):
+        node = trie
+        for char in word[:-1]:
+            node = node.setdefault(char, {})
+            if node is None:
+                break
+        else:
+            node[word[-1]] = None
+    return trie
+
+
+def _trie_pattern(node):
+    if node is None:
+        return ''
+    if all(child is None for child in node.values()) and len(node) > 1:
+        return '[' + ''.join(re.escape(char) for char in sorted(node)) + ']'
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(node.items())
+    ]
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+class BadWordMatcher:
+    """
+    Все запрещённые слова, скомпилированные в одно регулярное выражение.
+
+    Выражение повторяет префиксное дерево слов, поэтому движок проверяет
+    каждую позицию текста за время, зависящее от длины слов,
+    а не от их количества.
+    """
+
+    def __init__(self, words=()):
+        self.load(words)
+
+    def load(self, words):
+        """Перекомпилирует выражение под новый список слов."""
+        words = {word.strip().lower() for word in words} - {''}
+        # Присваивание атомарно: параллельные запросы видят
+        # либо старое, либо новое выражение целиком.
+        self.pattern = (
+            re.compile(_trie_pattern(_build_trie(words))) if words else None
+        )
+
+    def search(self, text):
+        """Первое запрещённое слово в тексте или None."""
+        if self.pattern is None:
+            return None
+        match = self.pattern.search(text.lower())
+        return match.group() if match else None
+
+
+class BannedWords:
+    """
+    Копия словаря BannedWord в памяти процесса.
+
+    На каждой проверке сверяется только версия словаря в кэше; базу
+    читаем и выражение перекомпилируем, лишь когда версия сменилась.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.matcher = BadWordMatcher()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        version = get_banned_words_version()
+        if version == self.version:
+            return
+        # Пересобирает словарь один поток; остальные дождутся его
+        # и увидят уже актуальную версию.
+        with self._lock:
+            if version != self.version:
+                self.matcher.load(
+                    BannedWord.objects.values_list('word', flat=True)
+                )
+                self.version = version
+
+    def search(self, text):
+        """Первое запрещённое слово в тексте или None."""
+        self.refresh()
+        return self.matcher.search(text)
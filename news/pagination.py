@@ -0,0 +1,85 @@
+"""Постраничный вывод комментариев по ключу (keyset pagination)."""
+from collections import namedtuple
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+from .models import Comment
+
+CURSOR_SEPARATOR = '_'
+
+CommentPage = namedtuple('CommentPage', ('news_id', 'comments', 'next_cursor'))
+
+
+def _format_cursor(created, pk):
+    return f'{created.isoformat()}{CURSOR_SEPARATOR}{pk}'
+
+
+def encode_cursor(comment):
+    """Курсор указывает на последний показанный комментарий."""
+    return _format_cursor(comment.created, comment.pk)
+
+
+def decode_cursor(cursor):
+    created, _, pk = cursor.rpartition(CURSOR_SEPARATOR)
+    try:
+        return datetime.fromisoformat(created), int(pk)
+    except ValueError:
+        raise BadRequest('Некорректный курсор.')
+
+
+def normalize_cursor(cursor):
+    """
+    Курсор в том виде, в каком его выдаёт encode_cursor.
+
+    Курсор приходит от клиента и входит в ключ кэша: разные записи
+    одной позиции не должны создавать разные ключи.
+    """
+    return _format_cursor(*decode_cursor(cursor))
+
+
+def get_comment_queryset(news_id, cursor=None):
+    """Комментарии новости в порядке (created, id), начиная после курсора."""
+    queryset = Comment.objects.filter(
+        news_id=news_id
+    ).select_related('author').order_by('created', 'pk')
+    if cursor:
+        created, pk = decode_cursor(cursor)
+        # Отдельное условие created >= курсора позволяет базе начать
+        # поиск по индексу (news, created, id) сразу с нужного места.
+        queryset = queryset.filter(
+            Q(created__gt=created) | Q(pk__gt=pk),
+            created__gte=created,
+        )
+    return queryset
+
+
+def _make_page(news_id, comments, size):
+    # Берём на один комментарий больше, чтобы узнать, есть ли продолжение.
+    next_cursor = None
+    if len(comments) > size:
+        comments = comments[:size]
+        next_cursor = encode_cursor(comments[-1])
+    return CommentPage(news_id, comments, next_cursor)
+
+
+def get_comment_page(news_id, cursor=None, size=None):
+    """
+    Возвращает срез комментариев новости, следующий за курсором.
+
+    Комментарии упорядочены по паре (created, id), поэтому следующий срез
+    выбирается условием «строго после курсора», а не смещением:
+    стоимость запроса не зависит от номера страницы.
+    """
+    size = size or settings.COMMENT_COUNT_ON_DETAIL_PAGE
+    queryset = get_comment_queryset(news_id, cursor)[:size + 1]
+    return _make_page(news_id, list(queryset), size)
+
+
+async def aget_comment_page(news_id, cursor=None, size=None):
+    """Асинхронный вариант get_comment_page."""
+    size = size or settings.COMMENT_COUNT_ON_DETAIL_PAGE
+    queryset = get_comment_queryset(news_id, cursor)[:size + 1]
+    return _make_page(news_id, [comment async for comment in queryset], size)
@@ -2,8 +2,10 @@ import pytest
 from datetime import datetime
 from django.test.client import Client
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
+from news.management.utils import reload_urlconf
 from news.models import News, Comment
 
 
@@ -55,6 +57,36 @@ def enable_db_access_for_all_tests(db):
     """Автоматически предоставляет доступ к БД для всех тестов."""
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш страниц не должен переживать откат базы между тестами."""
+    cache.clear()
+
+
+@pytest.fixture
+def shared_cache(settings):
+    """
+    Сессии и пользователи из кэша, как с общим кэшем (YANEWS_REDIS_URL).
+
+    Тесты идут в одном процессе, так что кэш в памяти для них общий.
+    """
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    settings.AUTHENTICATION_BACKENDS = [
+        'news.auth.CachedModelBackend',
+        *settings.AUTHENTICATION_BACKENDS,
+    ]
+
+
+@pytest.fixture
+def async_read_views(settings):
+    """Главную и страницу новости обслуживают асинхронные представления."""
+    settings.NEWS_ASYNC_READ_VIEWS = True
+    reload_urlconf()
+    yield
+    settings.NEWS_ASYNC_READ_VIEWS = False
+    reload_urlconf()
+
+
 @pytest.fixture
 def user_model():
     """Фикстура возвращает модель пользователя."""
@@ -0,0 +1,88 @@
+import pytest
+from django.urls import reverse
+
+from news.auth import user_cache
+from news.checks import check_cache_versions, check_shared_cache
+
+# Клиенты входят после shared_cache: сессии запоминают CachedModelBackend.
+pytestmark = pytest.mark.usefixtures('shared_cache')
+
+
+def test_logged_in_page_runs_no_queries(
+        author_client, author, home_url, django_assert_num_queries
+):
+    author_client.get(home_url)
+    with django_assert_num_queries(0):
+        response = author_client.get(home_url)
+    assert author.username in response.content.decode()
+
+
+def test_password_change_ends_other_sessions(
+        author_client, author, home_url
+):
+    assert author.username in author_client.get(home_url).content.decode()
+    author.set_password('new-password-123')
+    author.save()
+    # Хэш пароля в сессии устарел: пользователь из памяти не подходит.
+    assert 'Войти' in author_client.get(home_url).content.decode()
+
+
+def test_blocked_user_is_logged_out(author_client, author, home_url):
+    author_client.get(home_url)
+    author.is_active = False
+    author.save()
+    assert 'Войти' in author_client.get(home_url).content.decode()
+
+
+def test_logout_forgets_user(author_client, author, home_url):
+    author_client.get(home_url)
+    author_client.get(reverse('users:logout'))
+    assert user_cache.get(author.pk) is None
+    assert 'Войти' in author_client.get(home_url).content.decode()
+
+
+def test_cached_user_is_copied(author_client, author, home_url):
+    author_client.get(home_url)
+    first = user_cache.get(author.pk)
+    first.username = 'Подмена'
+    assert user_cache.get(author.pk).username == author.username
+
+
+def test_async_pages_use_cached_user(
+        async_read_views, author_client, author, home_url,
+        django_assert_num_queries
+):
+    author_client.get(home_url)
+    with django_assert_num_queries(0):
+        response = author_client.get(home_url)
+    assert author.username in response.content.decode()
+
+
+def test_default_settings_pass_shared_cache_check(settings):
+    # Без общего кэша сессии и пользователи читаются из базы.
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    settings.AUTHENTICATION_BACKENDS = [
+        'django.contrib.auth.backends.ModelBackend'
+    ]
+    assert check_shared_cache(None) == []
+
+
+def test_process_local_cache_is_reported():
+    # shared_cache включил кэш сессий и пользователей при LocMemCache.
+    errors = check_shared_cache(None)
+    assert {error.id for error in errors} == {'news.W001'}
+    assert len(errors) == 2
+
+
+def test_process_local_cache_versions_are_reported():
+    assert [error.id for error in check_cache_versions(None)] == ['news.W002']
+
+
+def test_shared_cache_passes_versions_check(settings):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://localhost:6379',
+        }
+    }
+    assert check_cache_versions(None) == []
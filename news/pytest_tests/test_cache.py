@@ -0,0 +1,202 @@
+from http import HTTPStatus
+
+from django.urls import reverse
+
+from news.models import Comment
+
+
+def test_home_page_cache_hit_runs_no_queries(
+        client,
+        home_url,
+        news,
+        django_assert_num_queries
+):
+    client.get(home_url)
+    with django_assert_num_queries(0):
+        response = client.get(home_url)
+    assert news.title in response.content.decode()
+
+
+def test_home_page_cache_follows_comment_writes(
+        client,
+        author_client,
+        home_url,
+        news,
+        detail_url
+):
+    assert 'Комментариев' not in client.get(home_url).content.decode()
+    author_client.post(detail_url, data={'text': 'Первый комментарий'})
+    assert 'Комментариев: 1' in client.get(home_url).content.decode()
+    comment = Comment.objects.get()
+    author_client.post(
+        reverse('news:edit', kwargs={'pk': comment.pk}),
+        data={'text': 'Исправленный комментарий'}
+    )
+    assert 'Комментариев: 1' in client.get(home_url).content.decode()
+    author_client.post(reverse('news:delete', kwargs={'pk': comment.pk}))
+    assert 'Комментариев' not in client.get(home_url).content.decode()
+
+
+def test_home_page_cache_follows_admin_writes(
+        client,
+        admin_client,
+        home_url,
+        news
+):
+    assert news.title in client.get(home_url).content.decode()
+    response = admin_client.post(
+        reverse('admin:news_news_delete', args=(news.pk,)),
+        data={'post': 'yes'}
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert news.title not in client.get(home_url).content.decode()
+
+
+def test_detail_page_cache_hit_runs_no_queries(
+        client,
+        detail_url,
+        comment,
+        django_assert_num_queries
+):
+    client.get(detail_url)
+    with django_assert_num_queries(0):
+        response = client.get(detail_url)
+    assert comment.text in response.content.decode()
+
+
+def test_cached_detail_page_shows_controls_only_to_author(
+        author_client,
+        not_author_client,
+        detail_url,
+        comment,
+        comment_edit_url
+):
+    # Первый запрос от автора кладёт общую часть страницы в кэш.
+    assert comment_edit_url in author_client.get(detail_url).content.decode()
+    content = not_author_client.get(detail_url).content.decode()
+    assert comment.text in content
+    assert comment_edit_url not in content
+
+
+def test_detail_page_cache_follows_comment_writes(
+        client,
+        author_client,
+        detail_url,
+        comment,
+        comment_edit_url,
+        comment_delete_url
+):
+    assert comment.text in client.get(detail_url).content.decode()
+    author_client.post(comment_edit_url, data={'text': 'Новый текст'})
+    content = client.get(detail_url).content.decode()
+    assert 'Новый текст' in content
+    assert comment.text not in content
+    author_client.post(detail_url, data={'text': 'Ещё комментарий'})
+    assert 'Ещё комментарий' in client.get(detail_url).content.decode()
+    author_client.post(comment_delete_url)
+    assert 'Новый текст' not in client.get(detail_url).content.decode()
+
+
+def test_cached_comment_markup_is_not_escaped(client, detail_url, comment):
+    client.get(detail_url)
+    content = client.get(detail_url).content.decode()
+    assert f'<b>{comment.author}</b>' in content
+
+
+def revalidate(client, url):
+    """Повторный запрос страницы с ETag из первого ответа."""
+    etag = client.get(url)['ETag']
+    return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+
+def test_home_page_revalidation_runs_no_queries(
+        client, home_url, news, django_assert_num_queries
+):
+    etag = client.get(home_url)['ETag']
+    with django_assert_num_queries(0):
+        response = client.get(home_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response['ETag'] == etag
+
+
+def test_detail_page_revalidation_reads_only_session(
+        author_client, detail_url, comment, django_assert_num_queries
+):
+    etag = author_client.get(detail_url)['ETag']
+    with django_assert_num_queries(1):
+        response = author_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_detail_page_revalidation_with_shared_cache(
+        shared_cache, author_client, detail_url, comment,
+        django_assert_num_queries
+):
+    etag = author_client.get(detail_url)['ETag']
+    # Сессия читается из кэша (cached_db).
+    with django_assert_num_queries(0):
+        response = author_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_etag_depends_on_user(
+        client, author_client, not_author_client, detail_url, news
+):
+    etags = {
+        current.get(detail_url)['ETag']
+        for current in (client, author_client, not_author_client)
+    }
+    assert len(etags) == 3
+
+
+def test_etag_changes_on_relogin(client, author, detail_url, news):
+    # Вход меняет CSRF-токен в форме комментария: старая копия
+    # страницы не годится, хотя пользователь тот же.
+    client.force_login(author)
+    etag = client.get(detail_url)['ETag']
+    client.logout()
+    client.force_login(author)
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+def test_etag_follows_comment_writes(
+        client,
+        author_client,
+        home_url,
+        detail_url,
+        comment,
+        comment_edit_url,
+        comment_delete_url
+):
+    for write in (
+        lambda: author_client.post(detail_url, data={'text': 'Новый'}),
+        lambda: author_client.post(
+            comment_edit_url, data={'text': 'Исправленный'}
+        ),
+        lambda: author_client.post(comment_delete_url),
+    ):
+        etags = {
+            url: client.get(url)['ETag'] for url in (home_url, detail_url)
+        }
+        assert write().status_code == HTTPStatus.FOUND
+        for url, etag in etags.items():
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.OK
+            assert response['ETag'] != etag
+
+
+def test_deleted_news_is_not_revalidated(client, detail_url, news):
+    etag = client.get(detail_url)['ETag']
+    news.delete()
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_async_pages_are_revalidated(
+        async_read_views, author_client, home_url, detail_url, comment
+):
+    for url in (home_url, detail_url):
+        response = revalidate(author_client, url)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
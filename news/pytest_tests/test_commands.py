@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+import tracemalloc
+from datetime import date, timedelta
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.urls import reverse
+
+from news.models import Comment, CommentActivity, News
+
+
+def test_seed_news_creates_dataset():
+    call_command('seed_news', news=3, comments=4, users=2, verbosity=0)
+    assert News.objects.count() == 3
+    assert Comment.objects.count() == 12
+    assert get_user_model().objects.count() == 2
+    # Время создания комментариев распределено, а не равно моменту вставки.
+    assert Comment.objects.values('created').distinct().count() > 1
+    assert set(News.objects.values_list('comment_count', flat=True)) == {4}
+    assert sum(
+        CommentActivity.objects.values_list('count', flat=True)
+    ) == 12
+
+
+def test_recount_comments_finds_and_fixes_drift(news, comment):
+    call_command('recount_comments', check=True, stdout=io.StringIO())
+    News.objects.update(comment_count=5, last_comment_at=None)
+    with pytest.raises(CommandError, match='1'):
+        call_command('recount_comments', check=True, stdout=io.StringIO())
+    call_command('recount_comments', batch_size=1, stdout=io.StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    assert news.last_comment_at == comment.created
+    call_command('recount_comments', check=True, stdout=io.StringIO())
+
+
+def test_refresh_rankings_rebuilds_activity(client, news, comment):
+    url = reverse('news:discussed')
+    assert news.title in client.get(url).content.decode()
+    CommentActivity.objects.all().delete()
+    # Рейтинг в кэше живёт до пересчёта.
+    assert news.title in client.get(url).content.decode()
+    call_command('refresh_rankings', stdout=io.StringIO())
+    assert news.title not in client.get(url).content.decode()
+    call_command('refresh_rankings', rebuild=True, stdout=io.StringIO())
+    assert CommentActivity.objects.get().count == 1
+    assert news.title in client.get(url).content.decode()
+
+
+def test_import_news_skips_duplicates(tmp_path, news):
+    path = tmp_path / 'news.csv'
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, ('title', 'text', 'date'))
+        writer.writeheader()
+        writer.writerows((
+            {'title': 'Свежая', 'text': 'Текст', 'date': '2024-01-01'},
+            {'title': 'Свежая', 'text': 'Дубль', 'date': '2024-01-01'},
+            {'title': 'Свежая', 'text': 'Другой день', 'date': '2024-01-02'},
+            {'title': news.title, 'text': 'Дубль', 'date': str(date.today())},
+            {'title': '', 'text': 'Без заголовка', 'date': '2024-01-01'},
+        ))
+    call_command('import_news', str(path), batch_size=2, stderr=io.StringIO())
+    assert News.objects.count() == 3
+    assert set(News.objects.values_list('text', flat=True)) == {
+        news.text, 'Текст', 'Другой день'
+    }
+
+
+def test_import_news_skips_rows_of_wrong_types(tmp_path):
+    path = tmp_path / 'news.jsonl'
+    path.write_text('\n'.join(json.dumps(row) for row in (
+        {'title': 5, 'text': 'Число вместо заголовка'},
+        {'title': 'Без текста', 'text': None},
+        {'title': 'Дата числом', 'text': 'Текст', 'date': 20240101},
+        ['не', 'объект'],
+        {'title': 'Верная', 'text': 'Текст', 'date': '2024-01-01'},
+    )), encoding='utf-8')
+    stderr = io.StringIO()
+    call_command(
+        'import_news', str(path), stdout=io.StringIO(), stderr=stderr
+    )
+    assert list(News.objects.values_list('title', flat=True)) == ['Верная']
+    assert stderr.getvalue().count('пропущена') == 4
+
+
+def test_import_100k_news_in_constant_memory(tmp_path):
+    rows = 100_000
+    path = tmp_path / 'news.jsonl'
+    with open(path, 'w', encoding='utf-8') as file:
+        for index in range(rows):
+            file.write(json.dumps({
+                'title': f'Новость {index}',
+                'text': 'Текст новости',
+                'date': str(date(2024, 1, 1) + timedelta(days=index % 365)),
+            }) + '\n')
+    tracemalloc.start()
+    try:
+        call_command('import_news', str(path), stdout=io.StringIO())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert News.objects.count() == rows
+    # В памяти одновременно только одна пачка, а не весь файл.
+    assert peak < path.stat().st_size
+
+
+def test_export_news_in_date_order_and_resume(author):
+    today = date.today()
+    old, fresh, middle = News.objects.bulk_create(
+        News(title=title, text='Текст', date=today - timedelta(days=days))
+        for title, days in (('Старая', 3), ('Свежая', 0), ('Средняя', 1))
+    )
+    Comment.objects.create(news=middle, author=author, text='Первый')
+    Comment.objects.create(news=middle, author=author, text='Второй')
+    output = io.StringIO()
+    call_command('export_news', chunk_size=1, stdout=output)
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [row['title'] for row in rows] == ['Старая', 'Средняя', 'Свежая']
+    assert [
+        comment['text'] for comment in rows[1]['comments']
+    ] == ['Первый', 'Второй']
+    assert rows[1]['comments'][0]['author'] == author.username
+    output = io.StringIO()
+    call_command(
+        'export_news', format='csv', after=old.pk, stdout=output
+    )
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert [(row['title'], row['comment_text']) for row in rows] == [
+        ('Средняя', 'Первый'), ('Средняя', 'Второй'), ('Свежая', ''),
+    ]
+
+
+def test_export_view_streams_news(admin_client, news, comment):
+    response = admin_client.get(reverse('news:export'), {'format': 'csv'})
+    assert response.streaming
+    content = b''.join(response.streaming_content).decode()
+    assert news.title in content
+    assert comment.text in content
+
+
+@pytest.mark.parametrize('after, status', (
+    ('²', HTTPStatus.BAD_REQUEST),
+    ('новость', HTTPStatus.BAD_REQUEST),
+    ('9' * 25, HTTPStatus.NOT_FOUND),
+))
+def test_export_view_with_broken_after(admin_client, news, after, status):
+    response = admin_client.get(reverse('news:export'), {'after': after})
+    assert response.status_code == status
+
+
+def test_bench_site_reports_and_detects_regressions(tmp_path):
+    report_path = tmp_path / 'report.json'
+    options = dict(
+        news=2, comments=2, users=1, requests=4, login_requests=1,
+        warmup=1, text_size=1000, stdout=io.StringIO(),
+    )
+    call_command('bench_site', output=str(report_path), **options)
+    report = json.loads(report_path.read_text(encoding='utf-8'))
+    assert set(report['scenarios']) == {
+        'home', 'detail', 'detail_auth', 'admin_news', 'comment_create',
+        'comment_edit_page', 'comment_edit', 'comment_delete', 'login',
+    }
+    assert report['scenarios']['home']['requests'] == 4
+    # Всё созданное бенчмарком откачено.
+    assert not News.objects.exists()
+    # После прогрева главная отдаётся из кэша, без кэша — из базы.
+    assert report['scenarios']['home']['queries'] == 0
+    assert report['scenarios']['home']['cold_queries'] > 0
+    report['scenarios']['comment_create']['queries'] -= 1
+    report['scenarios']['home']['cold_queries'] -= 1
+    baseline_path = tmp_path / 'baseline.json'
+    baseline_path.write_text(json.dumps(report), encoding='utf-8')
+    # Задержки на четырёх запросах шумят, проверяем только число запросов.
+    with pytest.raises(CommandError, match='comment_create: SQL') as error:
+        call_command(
+            'bench_site', compare=str(baseline_path), tolerance=1000,
+            **options
+        )
+    assert 'home: SQL-запросов без кэша' in str(error.value)
+
+
+def test_production_sqlite_profile(tmp_path, settings):
+    profile = settings.SQLITE_PROFILES['production']
+    connection = connections['default']
+    wrapper = connection.__class__(
+        {
+            **connection.settings_dict, **profile,
+            'NAME': str(tmp_path / 'db.sqlite3'),
+        },
+        alias=connection.alias,
+    )
+    try:
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            assert cursor.fetchone() == ('wal',)
+            cursor.execute('PRAGMA synchronous')
+            assert cursor.fetchone() == (1,)
+        assert wrapper.transaction_mode == 'IMMEDIATE'
+    finally:
+        wrapper.close()
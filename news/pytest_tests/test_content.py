@@ -1,8 +1,20 @@
+import tracemalloc
 from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
 
-from news.models import News, Comment
+from news import counters
+from news.admin import EstimatedCountPaginator
+from news.models import News, Comment, CommentActivity
+from news.ranking import bucket
 from news.forms import CommentForm
+from news.views import AsyncNewsList
 
 
 def test_news_count_on_home_page(client, home_url):
@@ -78,4 +90,272 @@ def test_authorized_client_has_comment_form(author_client, detail_url):
     )
     assert isinstance(response.context['form'], CommentForm), (
         'Проверьте, что форма в контексте — это `CommentForm`.'
-    )
\ No newline at end of file
+    )
+
+
+@pytest.mark.parametrize('comments_per_news', (0, 1, 50))
+def test_home_page_query_count_does_not_depend_on_comments(
+        client,
+        home_url,
+        author,
+        comments_per_news,
+        django_assert_num_queries
+):
+    all_news = News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст новости')
+        for index in range(3)
+    )
+    for news in all_news:
+        for index in range(comments_per_news):
+            Comment.objects.create(
+                news=news, author=author, text=f'Комментарий {index}'
+            )
+    with django_assert_num_queries(1):
+        response = client.get(home_url)
+    for news in response.context['object_list']:
+        assert news.comment_count == comments_per_news
+        assert not hasattr(news, '_prefetched_objects_cache'), (
+            'Главная страница не должна загружать сами комментарии.'
+        )
+    if comments_per_news:
+        content = response.content.decode()
+        assert f'Комментариев: {comments_per_news}' in content
+
+
+def test_home_page_memory_does_not_depend_on_comments(
+        client, home_url, author
+):
+    all_news = News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст новости')
+        for index in range(3)
+    )
+
+    def peak_memory():
+        cache.clear()
+        tracemalloc.start()
+        client.get(home_url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    # Первый ответ компилирует шаблоны и наполняет служебные кэши.
+    peak_memory()
+    without_comments = peak_memory()
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for news in all_news
+        for index in range(1000)
+    )
+    # Три тысячи объектов Comment заняли бы мегабайты.
+    assert peak_memory() - without_comments < 200_000
+
+
+def test_home_page_does_not_load_news_text(
+        client, home_url, django_assert_num_queries
+):
+    news = News.objects.create(
+        title='Длинная', text='Начало статьи. ' + 'слово ' * 100_000
+    )
+    with django_assert_num_queries(1) as captured:
+        response = client.get(home_url)
+    assert '"text"' not in captured.captured_queries[0]['sql']
+    assert 'Начало статьи. слово' in response.content.decode()
+    news.text = 'Другое начало.'
+    news.save(update_fields=('text',))
+    news.refresh_from_db()
+    assert news.excerpt == 'Другое начало.'
+
+
+def test_fixture_news_have_excerpts(client, home_url):
+    # loaddata сохраняет в обход save(): анонс заполняет сигнал.
+    call_command('loaddata', 'news.json', verbosity=0)
+    assert not News.objects.filter(excerpt='').exists()
+    news = News.objects.first()
+    assert news.excerpt in client.get(home_url).content.decode()
+
+
+def test_comments_are_paginated_by_cursor(
+        client,
+        news,
+        author,
+        detail_url,
+        settings,
+        django_assert_num_queries
+):
+    settings.COMMENT_COUNT_ON_DETAIL_PAGE = 2
+    now = timezone.now()
+    for index in range(7):
+        comment = Comment.objects.create(
+            news=news, author=author, text=f'Комментарий {index}'
+        )
+        # У пары комментариев совпадает время создания:
+        # порядок между ними определяет id.
+        comment.created = now - timedelta(minutes=index // 2)
+        comment.save()
+    expected_ids = list(
+        news.comment_set.order_by('created', 'pk').values_list('pk', flat=True)
+    )
+    page = client.get(detail_url).context['page']
+    seen_ids = [comment.pk for comment in page.comments]
+    assert len(seen_ids) == 2
+    comments_url = reverse('news:comments', kwargs={'pk': news.pk})
+    while page.next_cursor:
+        # Стоимость каждой следующей порции не зависит от её номера.
+        with django_assert_num_queries(1):
+            response = client.get(comments_url, {'after': page.next_cursor})
+        page = response.context['page']
+        seen_ids += [comment.pk for comment in page.comments]
+    assert seen_ids == expected_ids
+
+
+def test_comments_with_broken_cursor(client, news):
+    comments_url = reverse('news:comments', kwargs={'pk': news.pk})
+    response = client.get(comments_url, {'after': 'не-курсор'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_comments_of_unknown_news(client, news):
+    comments_url = reverse('news:comments', kwargs={'pk': news.pk + 1})
+    assert client.get(comments_url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_async_read_views(
+        async_read_views,
+        client,
+        author_client,
+        home_url,
+        detail_url,
+        news,
+        comment
+):
+    response = client.get(home_url)
+    assert response.resolver_match.func.view_class is AsyncNewsList
+    assert news.title in response.content.decode()
+    response = client.get(detail_url)
+    assert comment.text in response.content.decode()
+    assert 'form' not in response.context
+    form = author_client.get(detail_url).context['form']
+    assert isinstance(form, CommentForm)
+    response = author_client.post(detail_url, data={'text': 'Асинхронно'})
+    assert response.status_code == HTTPStatus.FOUND
+    assert 'Асинхронно' in client.get(detail_url).content.decode()
+    assert client.get(
+        reverse('news:detail', kwargs={'pk': news.pk + 1})
+    ).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_feeds_rank_news_by_comment_activity(
+        client, author, django_assert_num_queries
+):
+    quiet, busy, old = News.objects.bulk_create(
+        News(title=title, text='Текст')
+        for title in ('Тихая', 'Шумная', 'Старая')
+    )
+    for index in range(3):
+        Comment.objects.create(news=busy, author=author, text=f'{index}')
+    Comment.objects.create(news=quiet, author=author, text='Последний')
+    # Обсуждение старой новости давно вышло из окна.
+    CommentActivity.objects.create(
+        news=old, hour=bucket(timezone.now() - timedelta(days=3)), count=50
+    )
+    News.objects.filter(pk=old.pk).update(
+        last_comment_at=timezone.now() - timedelta(days=3)
+    )
+    for url, expected in (
+        (reverse('news:discussed'), [busy, quiet]),
+        (reverse('news:active'), [quiet, busy, old]),
+    ):
+        client.get(url)
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        content = response.content.decode()
+        positions = [content.find(news.title) for news in expected]
+        assert -1 not in positions and positions == sorted(positions)
+        if old not in expected:
+            assert old.title not in content
+    assert busy.commentactivity_set.get().count == 3
+
+
+def test_admin_news_list_does_not_load_text(
+        admin_client, news, django_assert_max_num_queries
+):
+    with django_assert_max_num_queries(10) as captured:
+        response = admin_client.get(reverse('admin:news_news_changelist'))
+    assert news.title in response.content.decode()
+    assert not any(
+        '"news_news"."text"' in query['sql']
+        for query in captured.captured_queries
+    )
+
+
+def test_admin_news_page_links_to_comments(admin_client, news, comment):
+    response = admin_client.get(
+        reverse('admin:news_news_change', args=(news.pk,))
+    )
+    assert 'inline_admin_formsets' not in response.context or not (
+        response.context['inline_admin_formsets']
+    )
+    assert (
+        f'{reverse("admin:news_comment_changelist")}?news__id__exact={news.pk}'
+        in response.content.decode()
+    )
+
+
+def test_admin_cant_move_comment_to_other_news(admin_client, comment, news):
+    other = News.objects.create(title='Другая', text='Текст')
+    response = admin_client.post(
+        reverse('admin:news_comment_change', args=(comment.pk,)),
+        {'news': other.pk, 'author': comment.author_id, 'text': 'Правка'},
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    comment.refresh_from_db()
+    assert (comment.news_id, comment.text) == (news.pk, 'Правка')
+    assert not counters.mismatches(News.objects.all()).exists()
+
+
+def test_admin_news_comments_query_count_is_constant(
+        admin_client, news, author, django_assert_max_num_queries
+):
+    url = (
+        f'{reverse("admin:news_comment_changelist")}'
+        f'?news__id__exact={news.pk}'
+    )
+    Comment.objects.create(news=news, author=author, text='Первый')
+    admin_client.get(url)
+    with django_assert_max_num_queries(100) as captured:
+        admin_client.get(url)
+    single = len(captured.captured_queries)
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(50)
+    )
+    with django_assert_max_num_queries(single):
+        response = admin_client.get(url)
+    assert response.context['cl'].result_count == 51
+
+
+def test_admin_news_search_uses_index(admin_client):
+    News.objects.create(title='Заголовок', text='Редкое слово барсук.')
+    News.objects.create(title='Другая', text='Ничего интересного.')
+    response = admin_client.get(
+        reverse('admin:news_news_changelist'), {'q': 'барсук'}
+    )
+    assert [news.title for news in response.context['cl'].result_list] == [
+        'Заголовок'
+    ]
+
+
+def test_admin_list_count_is_estimated_without_filters(
+        admin_client, monkeypatch
+):
+    monkeypatch.setattr(EstimatedCountPaginator, 'exact_count_limit', 2)
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст') for index in range(5)
+    )
+    News.objects.filter(pk=News.objects.order_by('pk').first().pk).delete()
+    url = reverse('admin:news_news_changelist')
+    response = admin_client.get(url)
+    # Оценка по наибольшему id учитывает и удалённую новость.
+    assert response.context['cl'].paginator.count == 5
+    response = admin_client.get(url, {'discussed': 'no'})
+    assert response.context['cl'].paginator.count == 4
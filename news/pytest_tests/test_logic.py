@@ -1,9 +1,11 @@
 import pytest
 from http import HTTPStatus
+from django.test.client import Client
+from django.urls import reverse
 from pytest_django.asserts import assertRedirects
 
-from news.models import Comment
-from news.forms import BAD_WORDS, WARNING
+from news.models import Comment, News
+from news.forms import BAD_WORDS, WARNING, CommentForm
 
 
 def test_anonymous_user_cant_post_comment(client, detail_url, login_url):
@@ -102,4 +104,122 @@ def test_user_cant_delete_others_comments(
     assert response.status_code == HTTPStatus.NOT_FOUND
     comments_count_after = Comment.objects.count()
     assert comments_count_after == comments_count_before
-    assert Comment.objects.filter(pk=comment.pk).exists()
\ No newline at end of file
+    assert Comment.objects.filter(pk=comment.pk).exists()
+
+
+@pytest.fixture
+def warm_banned_words():
+    """Словарь запрещённых слов уже прочитан процессом."""
+    CommentForm(data={'text': 'Прогрев словаря'}).is_valid()
+
+
+# Каждая запись: сессия и пользователь, один поиск, одна запись в базу;
+# создание и удаление ещё обновляют счётчики новости и счётчик часа
+# (строка часа уже создана комментарием из фикстуры). С общим кэшем
+# сессия и пользователь из базы не читаются.
+@pytest.mark.parametrize('url_fixture, form_data, queries', (
+    ('detail_url', {'text': 'Новый комментарий'}, 6),
+    ('comment_edit_url', {'text': 'Обновленный комментарий'}, 4),
+    ('comment_delete_url', {}, 6),
+))
+@pytest.mark.parametrize('shared', (False, True))
+def test_comment_write_query_count(
+        shared,
+        home_url,
+        author,
+        comment,
+        url_fixture,
+        form_data,
+        queries,
+        warm_banned_words,
+        django_assert_num_queries,
+        request
+):
+    if shared:
+        request.getfixturevalue('shared_cache')
+        queries -= 2
+    url = request.getfixturevalue(url_fixture)
+    # Вход после выбора настроек: сессия запомнит нужный бэкенд.
+    author_client = Client()
+    author_client.force_login(author)
+    # Первый запрос после входа загружает пользователя в память процесса.
+    author_client.get(home_url)
+    with django_assert_num_queries(queries):
+        response = author_client.post(url, data=form_data)
+    assert response.status_code == HTTPStatus.FOUND
+    assert response.url.endswith('#comments')
+
+
+def test_news_counters_follow_comments(
+        author_client, author, news, detail_url
+):
+    first = Comment.objects.create(news=news, author=author, text='Первый')
+    second = Comment.objects.create(news=news, author=author, text='Второй')
+    news.refresh_from_db()
+    assert news.comment_count == 2
+    assert news.last_comment_at == second.created
+    author_client.post(reverse('news:delete', args=(second.pk,)))
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    assert news.last_comment_at == first.created
+    author_client.post(detail_url, data={'text': 'Третий'})
+    news.refresh_from_db()
+    assert news.comment_count == 2
+    assert news.last_comment_at == Comment.objects.latest('created').created
+
+
+def test_news_counters_survive_cascades(author, not_author, news):
+    other = News.objects.create(title='Другая', text='Текст')
+    Comment.objects.create(news=news, author=author, text='Автора')
+    Comment.objects.create(news=news, author=not_author, text='Читателя')
+    Comment.objects.create(news=other, author=author, text='Автора')
+    author.delete()
+    news.refresh_from_db()
+    other.refresh_from_db()
+    assert (news.comment_count, other.comment_count) == (1, 0)
+    assert other.last_comment_at is None
+    # Удаление новости вместе с комментариями не трогает её счётчики.
+    news.delete()
+    assert not Comment.objects.exists()
+
+
+def test_stale_news_save_keeps_counters(author, news):
+    stale = News.objects.get(pk=news.pk)
+    comment = Comment.objects.create(news=news, author=author, text='Текст')
+    stale.title = 'Новый заголовок'
+    stale.save()
+    news.refresh_from_db()
+    assert news.title == 'Новый заголовок'
+    assert news.comment_count == 1
+    assert news.last_comment_at == comment.created
+
+
+def test_news_copy_is_inserted(news):
+    news.pk = None
+    news.save()
+    assert News.objects.count() == 2
+
+
+@pytest.mark.parametrize('method, url_fixture, loaded', (
+    ('get', 'comment_edit_url', {'news_news.title', 'news_comment.text'}),
+    ('get', 'comment_delete_url', {'news_news.title', 'news_comment.text'}),
+    ('post', 'comment_delete_url', set()),
+))
+def test_comment_pages_do_not_load_heavy_columns(
+        author_client,
+        method,
+        url_fixture,
+        loaded,
+        django_assert_max_num_queries,
+        request
+):
+    url = request.getfixturevalue(url_fixture)
+    with django_assert_max_num_queries(10) as captured:
+        getattr(author_client, method)(url)
+    sql = ' '.join(query['sql'] for query in captured.captured_queries)
+    sql = sql.replace('"', '')
+    assert 'news_news.text' not in sql
+    for column in {'news_news.title', 'news_comment.text'} - loaded:
+        assert column not in sql
+    for column in loaded:
+        assert column in sql
@@ -0,0 +1,74 @@
+import logging
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from news.metrics import FetchedBytes, percentile, request_stats
+from news.models import News
+
+
+@pytest.fixture(autouse=True)
+def clear_request_stats():
+    request_stats.clear()
+
+
+@pytest.mark.parametrize('percent, expected', (
+    (50, 5), (95, 10), (99, 10), (10, 1), (0, 1),
+))
+def test_percentile(percent, expected):
+    assert percentile(range(10, 0, -1), percent) == expected
+
+
+def test_empty_percentile():
+    assert percentile([], 50) is None
+
+
+def test_stats_are_collected_per_view_name(client, home_url, detail_url):
+    client.get(home_url)
+    client.get(home_url)
+    client.get(detail_url)
+    summary = request_stats.summary()
+    assert summary['news:home']['requests'] == 2
+    assert summary['news:home']['queries']['max'] == 1
+    assert summary['news:detail']['requests'] == 1
+    assert summary['news:detail']['wall_ms']['p50'] > 0
+
+
+def test_stats_endpoint(admin_client, home_url):
+    admin_client.get(home_url)
+    summary = admin_client.get(reverse('news:stats')).json()
+    assert summary['news:home']['requests'] == 1
+
+
+def test_requests_over_budget_are_logged(client, home_url, settings, caplog):
+    settings.QUERY_BUDGETS = {'news:home': 0}
+    with caplog.at_level(logging.WARNING, logger='news.middleware'):
+        client.get(home_url)
+    assert 'при бюджете 0' in caplog.text
+    caplog.clear()
+    cache.clear()
+    settings.QUERY_BUDGET_LOGGING = False
+    with caplog.at_level(logging.WARNING, logger='news.middleware'):
+        client.get(home_url)
+    assert not caplog.text
+
+
+def test_queries_of_async_views_are_counted(
+        async_read_views,
+        client,
+        detail_url
+):
+    client.get(detail_url)
+    # Новость и первая порция комментариев.
+    assert request_stats.summary()['news:detail']['queries']['max'] == 2
+
+
+def test_fetched_bytes_counts_loaded_columns(news):
+    fetched = FetchedBytes()
+    with fetched.watch():
+        list(News.objects.values_list('title'))
+    assert fetched.total == len(news.title.encode())
+    with fetched.watch():
+        list(News.objects.values_list('text'))
+    assert fetched.total == len(news.title.encode() + news.text.encode())
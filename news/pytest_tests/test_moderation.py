@@ -0,0 +1,196 @@
+import json
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from news import bulk, counters
+from news.forms import WARNING, CommentForm, bad_words
+from news.models import BannedWord, Comment, CommentActivity, News
+from news.moderation import BadWordMatcher
+
+
+@pytest.mark.parametrize('text, expected', (
+    ('Ну ты и РЕДИСКА!', 'редиска'),
+    ('редис на грядке', None),
+    ('Мой дом — не крепость', 'дом'),
+    ('Нет ни одного совпадения', None),
+    ('Ах ты негодник', None),
+    ('Ах ты негодяйка', 'негодяй'),
+))
+def test_matcher_finds_bad_words(text, expected):
+    matcher = BadWordMatcher(('редиска', 'негодяй', 'дом', 'домовой', '.*'))
+    assert matcher.search(text) == expected
+
+
+def test_matcher_treats_words_literally():
+    assert BadWordMatcher(('.*',)).search('обычный текст') is None
+    assert BadWordMatcher(('.*',)).search('подстрока .* внутри') == '.*'
+
+
+def test_matcher_reload():
+    matcher = BadWordMatcher()
+    assert matcher.search('редиска') is None
+    matcher.load(('редиска',))
+    assert matcher.search('редиска') == 'редиска'
+    matcher.load(())
+    assert matcher.search('редиска') is None
+
+
+def test_banned_words_are_edited_without_restart():
+    form = CommentForm(data={'text': 'Ты бармаглот!'})
+    assert form.is_valid()
+    word = BannedWord.objects.create(word='Бармаглот')
+    form = CommentForm(data={'text': 'Ты бармаглот!'})
+    assert not form.is_valid()
+    assert form.errors['text'] == [WARNING]
+    word.delete()
+    assert CommentForm(data={'text': 'Ты бармаглот!'}).is_valid()
+
+
+def test_banned_words_are_not_read_on_every_check(django_assert_num_queries):
+    CommentForm(data={'text': 'Первая проверка читает словарь'}).is_valid()
+    version = bad_words.version
+    with django_assert_num_queries(0):
+        assert not CommentForm(data={'text': 'Редиска'}).is_valid()
+    assert bad_words.version == version
+
+
+@pytest.fixture
+def many_comments(author, not_author, news):
+    other = News.objects.create(title='Другая', text='Текст')
+    now = timezone.now()
+    for index in range(6):
+        for item, user in ((news, author), (other, not_author)):
+            Comment.objects.create(
+                news=item, author=user, text=f'Комментарий {index}',
+                created=now - timedelta(hours=index),
+            )
+    Comment.objects.create(news=news, author=not_author, text='Ах, редиска')
+    return Comment.objects.all()
+
+
+def test_bulk_delete_keeps_counters(many_comments, author):
+    progress = list(bulk.moderate(
+        bulk.filter_comments(author=author.username), bulk.DELETE,
+        chunk_size=4,
+    ))
+    assert [step.checked for step in progress] == [4, 6]
+    assert progress[-1].affected == 6
+    assert not Comment.objects.filter(author=author).exists()
+    assert not counters.mismatches(News.objects.all()).exists()
+    activity = CommentActivity.objects.aggregate(total=Sum('count'))
+    assert activity['total'] == Comment.objects.count()
+
+
+def test_bulk_delete_runs_queries_per_chunk(
+        many_comments, django_assert_num_queries
+):
+    # На пачку: выборка, подбор строк и DELETE, счётчики новостей и часов
+    # и две точки сохранения внутри тестовой транзакции. Последняя,
+    # пустая выборка тоже в своей транзакции.
+    with django_assert_num_queries(7 * 2 + 3):
+        list(bulk.moderate(Comment.objects.all(), bulk.DELETE, chunk_size=7))
+
+
+def test_banned_recheck_flags_only_bad_comments(many_comments):
+    progress = list(bulk.moderate(
+        Comment.objects.all(), bulk.FLAG, bad_words
+    ))[-1]
+    assert progress == bulk.Progress(13, 1, 1)
+    assert list(Comment.objects.filter(is_flagged=True).values_list(
+        'text', flat=True
+    )) == ['Ах, редиска']
+
+
+def test_bulk_delete_updates_home(many_comments, client, home_url):
+    assert 'Комментариев: 7' in client.get(home_url).content.decode()
+    list(bulk.moderate(Comment.objects.all(), bulk.DELETE))
+    assert 'Комментариев: 7' not in client.get(home_url).content.decode()
+
+
+def test_moderation_view_is_for_staff(author_client, comment):
+    url = reverse('news:moderate')
+    response = author_client.post(url, {'action': bulk.DELETE, 'news': 1})
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+@pytest.fixture
+def moderator(author):
+    """Сотрудник только с правом менять комментарии."""
+    author.is_staff = True
+    author.save()
+    author.user_permissions.add(
+        Permission.objects.get(codename='change_comment')
+    )
+    return author
+
+
+@pytest.mark.parametrize('action, status', (
+    (bulk.DELETE, HTTPStatus.FORBIDDEN),
+    (bulk.FLAG, HTTPStatus.OK),
+))
+def test_moderation_view_checks_permission(
+    moderator, author_client, comment, action, status
+):
+    response = author_client.post(
+        reverse('news:moderate'), {'action': action, 'news': comment.news_id}
+    )
+    assert response.status_code == status
+    assert Comment.objects.filter(pk=comment.pk).exists()
+
+
+def test_moderation_view_denies_staff_without_permissions(
+    author, author_client, comment
+):
+    author.is_staff = True
+    author.save()
+    for action in (bulk.DELETE, bulk.FLAG):
+        response = author_client.post(
+            reverse('news:moderate'),
+            {'action': action, 'news': comment.news_id},
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN
+    comment.refresh_from_db()
+    assert not comment.is_flagged
+
+
+def test_moderation_view_requires_filter(admin_client, comment):
+    response = admin_client.post(
+        reverse('news:moderate'), {'action': bulk.DELETE}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert Comment.objects.exists()
+
+
+def test_moderation_view_streams_progress(admin_client, many_comments, news):
+    response = admin_client.post(
+        reverse('news:moderate'),
+        {'action': bulk.DELETE, 'news': news.pk, 'banned': 'on'},
+    )
+    lines = [
+        json.loads(line) for line in
+        b''.join(response.streaming_content).decode().splitlines()
+    ]
+    assert lines[-1] == {
+        'checked': 7, 'matched': 1, 'affected': 1, 'done': True
+    }
+    assert not Comment.objects.filter(text='Ах, редиска').exists()
+
+
+def test_admin_flags_banned_comments(admin_client, many_comments):
+    response = admin_client.post(
+        reverse('admin:news_comment_changelist'),
+        {
+            'action': 'flag_banned',
+            'select_across': 1,
+            '_selected_action': many_comments.values_list('pk', flat=True),
+        },
+        follow=True,
+    )
+    assert 'подошло: 1' in response.content.decode()
+    assert Comment.objects.filter(is_flagged=True).count() == 1
@@ -0,0 +1,122 @@
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.urls import reverse
+
+from news import cache as cache_module
+from news.models import Comment, News
+from news.routers import ReplicaRouter, routing
+
+
+# Имя реплики только для маршрутизации: запросы в неё не уходят.
+REPLICA = 'test-replica'
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.NEWS_READ_REPLICAS = [REPLICA]
+
+
+@pytest.fixture
+def sqlite_replica(settings, tmp_path):
+    """
+    Настоящая вторая база: свой файл SQLite со схемой, без репликации.
+
+    Запись, сделанная только в неё, показывает, откуда читал запрос.
+    Соединение создаётся в тесте, а не в settings.DATABASES, поэтому
+    pytest-django не создаёт для него тестовую базу в каждом прогоне.
+    """
+    alias = 'file-replica'
+    name = str(tmp_path / 'replica.sqlite3')
+    primary = connections['default']
+    replica = primary.__class__(
+        {**primary.settings_dict, 'NAME': name, 'TEST': {'NAME': name}},
+        alias,
+    )
+    setattr(connections._connections, alias, replica)
+    try:
+        call_command('migrate', database=alias, verbosity=0)
+        settings.NEWS_READ_REPLICAS = [alias]
+        yield alias
+    finally:
+        replica.close()
+        delattr(connections._connections, alias)
+
+
+def test_reads_go_to_primary_outside_requests(replicas):
+    assert ReplicaRouter().db_for_read(News) == 'default'
+
+
+def test_request_reads_news_from_replica(replicas):
+    router = ReplicaRouter()
+    with routing():
+        assert router.db_for_read(News) == REPLICA
+        assert router.db_for_read(Comment) == REPLICA
+        assert router.db_for_read(get_user_model()) == 'default'
+
+
+def test_write_pins_request_to_primary(replicas):
+    router = ReplicaRouter()
+    with routing():
+        assert router.db_for_write(Comment) == 'default'
+        assert router.db_for_read(News) == 'default'
+
+
+def test_news_from_replica_can_be_commented(replicas, news, author):
+    news._state.db = REPLICA
+    comment = Comment(news=news, author=author, text='Текст')
+    assert comment.news == news
+
+
+def test_write_sets_primary_cookie(replicas, author_client, news):
+    response = author_client.post(
+        reverse('news:detail', args=(news.pk,)), {'text': 'Комментарий'}
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    cookie = response.cookies[django_settings.NEWS_PRIMARY_COOKIE]
+    assert cookie['max-age'] == django_settings.NEWS_REPLICA_LAG
+    # По cookie страница читается с основной базы и видит комментарий.
+    assert 'Комментарий' in author_client.get(response.url).content.decode()
+
+
+def test_no_cookie_without_replicas(settings, author_client, news):
+    settings.NEWS_READ_REPLICAS = []
+    response = author_client.post(
+        reverse('news:detail', args=(news.pk,)), {'text': 'Комментарий'}
+    )
+    assert django_settings.NEWS_PRIMARY_COOKIE not in response.cookies
+
+
+def test_replica_fragments_are_cached_apart(replicas, settings):
+    # Фрагмент, отрисованный с основной базы после правки, не заменяется
+    # устаревшей отрисовкой с реплики, и наоборот.
+    with routing(pinned=True):
+        primary = cache_module._fragment('news:home:1')
+    with routing():
+        replica = cache_module._fragment('news:home:1')
+    assert primary == ('news:home:1', settings.NEWS_CACHE_TIMEOUT)
+    assert replica == ('news:home:1:replica', settings.NEWS_REPLICA_LAG)
+
+
+def test_mirror_of_primary_is_not_a_replica(settings):
+    settings.NEWS_READ_REPLICAS = ['default']
+    with routing():
+        assert ReplicaRouter().db_for_read(News) == 'default'
+
+
+def test_reads_come_from_sqlite_replica(sqlite_replica, client):
+    news = News.objects.using(sqlite_replica).create(
+        title='Только на реплике', text='Текст'
+    )
+    assert not News.objects.filter(pk=news.pk).exists()
+    url = reverse('news:detail', args=(news.pk,))
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert 'Только на реплике' in response.content.decode()
+    # Закреплённый за основной базой запрос новости не находит.
+    client.cookies[django_settings.NEWS_PRIMARY_COOKIE] = '1'
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
@@ -74,4 +74,16 @@ def test_comment_edit_delete_redirect_for_anonymous(
 def test_comment_edit_delete_for_other_user(not_author_client, comment, name):
     url = reverse(name, kwargs={'pk': comment.pk})
     response = not_author_client.get(url)
-    assert response.status_code == HTTPStatus.NOT_FOUND
\ No newline at end of file
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.parametrize('name', ('news:export', 'news:stats'))
+@pytest.mark.parametrize('client_fixture, status', (
+    ('anonymous_client', HTTPStatus.FOUND),
+    ('author_client', HTTPStatus.FORBIDDEN),
+    ('admin_client', HTTPStatus.OK),
+))
+def test_staff_pages_availability(name, client_fixture, status, request):
+    client = request.getfixturevalue(client_fixture)
+    response = client.get(reverse(name))
+    assert response.status_code == status
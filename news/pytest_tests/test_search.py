@@ -0,0 +1,116 @@
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+
+from news.cache import bump_search_version
+from news.models import News
+from news.search import python_index, search
+
+BACKENDS = ('fts5', 'python')
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, settings):
+    settings.NEWS_SEARCH_BACKEND = request.param
+    # Индекс в памяти живёт дольше тестовой базы.
+    python_index.reset()
+    return request.param
+
+
+@pytest.fixture
+def search_url():
+    return reverse('news:search')
+
+
+def titles(page):
+    return [result.news.title for result in page.results]
+
+
+def test_title_matches_rank_higher(backend):
+    News.objects.create(title='Погода', text='Завтра ждут дождь и ветер.')
+    News.objects.create(title='Дождь', text='Дождь идёт третий день.')
+    News.objects.create(title='Спорт', text='Матч прошёл без зрителей.')
+    assert titles(search('дождь')) == ['Дождь', 'Погода']
+    # Все слова запроса должны встретиться в новости.
+    assert titles(search('дождь ветер')) == ['Погода']
+    assert titles(search('снег')) == []
+
+
+def test_only_latest_matches_are_ranked(backend, settings):
+    settings.NEWS_SEARCH_MAX_CANDIDATES = 2
+    News.objects.create(title='Дождь', text='Дождь')
+    News.objects.create(title='Погода', text='Дождь')
+    News.objects.create(title='Прогноз', text='Дождь')
+    page = search('дождь')
+    assert sorted(titles(page)) == ['Погода', 'Прогноз']
+    assert page.truncated
+    assert not search('погода').truncated
+
+
+def test_truncated_results_are_reported(backend, client, search_url, settings):
+    settings.NEWS_SEARCH_MAX_CANDIDATES = 1
+    News.objects.bulk_create(
+        News(title=f'Выборы {index}', text='Текст') for index in range(2)
+    )
+    bump_search_version()
+    response = client.get(search_url, {'q': 'выборы'})
+    assert 'Совпадений слишком много' in response.content.decode()
+
+
+def test_snippet_is_highlighted_and_escaped(backend):
+    News.objects.create(
+        title='Разметка', text='Текст <script>alert(1)</script> про котов.'
+    )
+    snippet = search('котов').results[0].snippet
+    assert '<mark>котов</mark>' in snippet
+    assert '<script>' not in snippet
+    assert '&lt;script&gt;' in snippet
+
+
+def test_index_follows_news_changes(backend):
+    news = News.objects.create(title='Старый заголовок', text='Текст')
+    assert titles(search('старый')) == ['Старый заголовок']
+    news.title = 'Новый заголовок'
+    news.save()
+    assert titles(search('старый')) == []
+    assert titles(search('новый')) == ['Новый заголовок']
+    news.delete()
+    assert titles(search('новый')) == []
+
+
+def test_python_index_rebuilds_on_foreign_version(settings):
+    settings.NEWS_SEARCH_BACKEND = 'python'
+    python_index.reset()
+    assert titles(search('импорт')) == []
+    # Так другой процесс сообщает о новостях, добавленных без сигналов.
+    News.objects.bulk_create([News(title='Импорт', text='Текст')])
+    bump_search_version()
+    assert titles(search('импорт')) == ['Импорт']
+
+
+def test_search_page_is_paginated(backend, client, search_url, settings):
+    settings.NEWS_SEARCH_PAGE_SIZE = 2
+    News.objects.bulk_create(
+        News(title=f'Выборы {index}', text='Текст') for index in range(3)
+    )
+    bump_search_version()
+    response = client.get(search_url, {'q': 'выборы'})
+    assert len(response.context['page'].results) == 2
+    assert 'page=2' in response.content.decode()
+    response = client.get(search_url, {'q': 'выборы', 'page': 2})
+    assert len(response.context['page'].results) == 1
+    assert not response.context['page'].has_next
+
+
+@pytest.mark.parametrize('page', ('0', '-1', 'два', '²'))
+def test_search_with_broken_page(client, search_url, page):
+    response = client.get(search_url, {'q': 'выборы', 'page': page})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize('page', ('501', '9' * 25))
+def test_search_page_past_candidates(backend, client, search_url, page):
+    News.objects.create(title='Выборы', text='Текст')
+    response = client.get(search_url, {'q': 'выборы', 'page': page})
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,154 @@
+"""
+Ленты «самое обсуждаемое» и «недавно обсуждали».
+
+Комментарии считаются по часам в CommentActivity: каждый новый
+комментарий увеличивает счётчик своего часа, так что рейтинг за окно
+складывается из нескольких строк на новость, а не из всех комментариев.
+Готовые рейтинги лежат в кэше и пересчитываются не чаще раза
+в NEWS_RANKING_TIMEOUT секунд или командой refresh_rankings.
+"""
+from collections import Counter, namedtuple
+from datetime import timedelta, timezone as dt_timezone
+from functools import reduce
+from operator import or_
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, F, IntegerField, Q, Sum, Value, When
+)
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+
+from .models import CommentActivity, News
+
+DISCUSSED = 'discussed'
+ACTIVE = 'active'
+FEEDS = (DISCUSSED, ACTIVE)
+RANKING_KEY = 'news:ranking:{}'
+
+# Версия нужна, чтобы кэшировать отрисованную ленту до пересчёта.
+Ranking = namedtuple('Ranking', ('version', 'news_ids'))
+
+
+def bucket(moment):
+    """Начало часа (UTC), к которому относится момент."""
+    return moment.astimezone(dt_timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+def window_start(now=None):
+    """Первый час скользящего окна ленты «самое обсуждаемое»."""
+    now = now or timezone.now()
+    return bucket(now - timedelta(hours=settings.NEWS_TRENDING_WINDOW_HOURS))
+
+
+def comment_added(news_id, created):
+    """Обычно один UPDATE; первый комментарий часа ещё и создаёт строку."""
+    activity = CommentActivity.objects.filter(
+        news_id=news_id, hour=bucket(created)
+    )
+    if activity.update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            CommentActivity.objects.create(
+                news_id=news_id, hour=bucket(created), count=1
+            )
+    except IntegrityError:
+        # Строку часа успел создать параллельный запрос.
+        activity.update(count=F('count') + 1)
+
+
+def comment_removed(news_id, created):
+    CommentActivity.objects.filter(
+        news_id=news_id, hour=bucket(created)
+    ).update(count=Greatest(F('count') - 1, Value(0)))
+
+
+def comments_removed(comments):
+    """
+    Вычитает удалённые комментарии из счётчиков часов одним UPDATE.
+
+    comments — пары (id новости, время создания комментария).
+    """
+    hours = Counter(
+        (news_id, bucket(created)) for news_id, created in comments
+    )
+    if not hours:
+        return 0
+    conditions = [
+        (Q(news_id=news_id, hour=hour), count)
+        for (news_id, hour), count in hours.items()
+    ]
+    removed = Case(
+        *(When(condition, then=Value(count))
+          for condition, count in conditions),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return CommentActivity.objects.filter(
+        reduce(or_, (condition for condition, _ in conditions))
+    ).update(count=Greatest(F('count') - removed, Value(0)))
+
+
+def rebuild_activity(comments):
+    """
+    Записывает почасовые счётчики по комментариям queryset.
+
+    Нужна после пакетной вставки, которая не отправляет сигналы.
+    Счётчик часа заменяется, поэтому comments должны включать все
+    комментарии затронутых часов.
+    """
+    rows = comments.order_by().values('news').annotate(
+        hour=TruncHour('created', tzinfo=dt_timezone.utc),
+        total=Count('pk'),
+    ).values_list('news', 'hour', 'total')
+    return CommentActivity.objects.bulk_create(
+        (
+            CommentActivity(news_id=news_id, hour=hour, count=total)
+            for news_id, hour, total in rows.iterator()
+        ),
+        update_conflicts=True,
+        unique_fields=('news', 'hour'),
+        update_fields=('count',),
+    )
+
+
+def prune_activity(now=None):
+    """Удаляет часы, вышедшие из окна."""
+    deleted, _ = CommentActivity.objects.filter(
+        hour__lt=window_start(now)
+    ).delete()
+    return deleted
+
+
+def compute_ranking(feed):
+    size = settings.NEWS_COUNT_ON_HOME_PAGE
+    if feed == DISCUSSED:
+        news_ids = CommentActivity.objects.filter(
+            hour__gte=window_start(), count__gt=0
+        ).values('news').annotate(
+            total=Sum('count')
+        ).order_by('-total', '-news').values_list('news', flat=True)
+    else:
+        news_ids = News.objects.filter(
+            last_comment_at__isnull=False
+        ).order_by('-last_comment_at').values_list('pk', flat=True)
+    return Ranking(uuid4().hex, list(news_ids[:size]))
+
+
+def refresh_ranking(feed):
+    ranking = compute_ranking(feed)
+    cache.set(
+        RANKING_KEY.format(feed), ranking, settings.NEWS_RANKING_TIMEOUT
+    )
+    return ranking
+
+
+def get_ranking(feed):
+    """Рейтинг ленты из кэша; пересчитывается, когда истёк."""
+    return cache.get(RANKING_KEY.format(feed)) or refresh_ranking(feed)
@@ -0,0 +1,86 @@
+"""
+Чтение новостей и комментариев с реплик.
+
+Реплики перечислены в NEWS_READ_REPLICAS. С реплики читаются только
+страницы сайта, маршрут которых задаёт ReplicaRoutingMiddleware: команды
+и фоновые задачи, как и записи, работают с основной базой. Запрос,
+изменяющий данные, и все запросы пользователя в следующие
+NEWS_REPLICA_LAG секунд закреплены за основной базой, чтобы он сразу
+видел свои изменения, даже если реплика их ещё не получила.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICATED_MODELS = frozenset({'news.news', 'news.comment'})
+
+
+class RoutingState:
+    """Реплика запроса и закреплён ли он за основной базой."""
+
+    def __init__(self, replica, pinned):
+        self.replica = replica
+        self.pinned = pinned
+
+
+# Изменяемый объект, а не флаг: закрепление, сделанное в потоке
+# sync_to_async, видно и асинхронному представлению.
+_state = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def routing(pinned=False):
+    """Чтение с реплики, одной на весь запрос, пока он не закреплён."""
+    databases = connections.settings
+    # Реплика с той же базой, что и основная, — сама основная база:
+    # так в тестах, где реплика — зеркало и не видит транзакции теста.
+    replicas = [
+        alias for alias in settings.NEWS_READ_REPLICAS
+        if databases.get(alias, {}).get('NAME')
+        != databases[DEFAULT_DB_ALIAS]['NAME']
+    ]
+    state = RoutingState(
+        random.choice(replicas) if replicas else None, pinned
+    )
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def reading_replica():
+    """Читает ли текущий запрос новости с реплики."""
+    state = _state.get()
+    return state is not None and state.replica is not None and (
+        not state.pinned
+    )
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.label_lower in REPLICATED_MODELS
+            and reading_replica()
+        ):
+            return _state.get().replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # После записи, в том числе внутри транзакции, запрос читает
+        # только основную базу.
+        state = _state.get()
+        if state is not None:
+            state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Новость с реплики можно назначить комментарию для основной базы.
+        pool = {DEFAULT_DB_ALIAS, *settings.NEWS_READ_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
@@ -0,0 +1,366 @@
+"""
+Полнотекстовый поиск по заголовкам и текстам новостей.
+
+На SQLite поиск идёт по таблице FTS5 news_search: её заполняют триггеры
+на news_news, так что индекс обновляется и при bulk_create. На других
+базах (или с NEWS_SEARCH_BACKEND = 'python') работает обратный индекс
+в памяти процесса: сигналы News обновляют его на месте, а остальные
+процессы перестраивают свой индекс, увидев новую версию в кэше.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.http import Http404
+from django.utils.html import escape
+
+from .cache import bump_search_version, get_search_version
+from .models import News
+
+FTS_TABLE = 'news_search'
+# Во сколько раз слово заголовка весомее слова текста.
+TITLE_WEIGHT = 10
+SNIPPET_WORDS = 12
+# Символы-метки подсветки: в тексте новостей их не бывает,
+# и они переживают экранирование HTML.
+MARK_START, MARK_END = '\x02', '\x03'
+
+SearchResult = namedtuple('SearchResult', ('news', 'snippet'))
+# truncated: совпадений больше NEWS_SEARCH_MAX_CANDIDATES, и более
+# старые в выдачу не попали.
+SearchPage = namedtuple(
+    'SearchPage', ('query', 'number', 'results', 'has_next', 'truncated')
+)
+
+FTS_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    "title, text, content='news_news', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert '
+    'AFTER INSERT ON news_news BEGIN '
+    f'INSERT INTO {FTS_TABLE}(rowid, title, text) '
+    'VALUES (new.id, new.title, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete '
+    'AFTER DELETE ON news_news BEGIN '
+    f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text) '
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    # Только заголовок и текст: счётчики комментариев индекс не трогают.
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update '
+    'AFTER UPDATE OF title, text ON news_news BEGIN '
+    f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text) '
+    "VALUES ('delete', old.id, old.title, old.text); "
+    f'INSERT INTO {FTS_TABLE}(rowid, title, text) '
+    'VALUES (new.id, new.title, new.text); END',
+)
+
+
+def install_fts(schema_connection):
+    """
+    Создаёт таблицу FTS5 и триггеры, если их нет.
+
+    Вызывается миграцией и после каждой миграции: SQLite пересоздаёт
+    таблицу news_news при изменении полей и теряет её триггеры.
+    """
+    if schema_connection.vendor != 'sqlite':
+        return
+    with schema_connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE]
+        )
+        created = cursor.fetchone() is None
+        for sql in FTS_SQL:
+            cursor.execute(sql)
+        if created:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+
+
+def tokenize(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def highlight(text, terms):
+    """Отрывок текста вокруг первого найденного слова с подсветкой."""
+    words = list(re.finditer(r'\w+', text))
+    positions = [
+        index for index, word in enumerate(words)
+        if tokenize(word.group())[0] in terms
+    ]
+    start = max((positions or [0])[0] - SNIPPET_WORDS // 2, 0)
+    shown = words[start:start + SNIPPET_WORDS]
+    if not shown:
+        return ''
+    parts = []
+    cursor = shown[0].start()
+    for index, word in enumerate(shown, start=start):
+        parts.append(escape(text[cursor:word.start()]))
+        parts.append(
+            f'<mark>{escape(word.group())}</mark>'
+            if index in positions else escape(word.group())
+        )
+        cursor = word.end()
+    prefix = '…' if start else ''
+    suffix = '…' if start + SNIPPET_WORDS < len(words) else ''
+    return prefix + ''.join(parts) + suffix
+
+
+def _fts_snippet(raw):
+    return escape(raw).replace(MARK_START, '<mark>').replace(
+        MARK_END, '</mark>'
+    )
+
+
+def _fts_match(terms):
+    # Каждое слово в кавычках: служебный синтаксис FTS5 не сработает.
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def _fts_search(terms, offset, limit):
+    """
+    Пары (id новости, отрывок) по убыванию релевантности BM25
+    и признак того, что совпадения отброшены.
+
+    Ранжируются только NEWS_SEARCH_MAX_CANDIDATES последних добавленных
+    совпадений: для слова, которое есть почти в каждой новости, BM25
+    по всем совпадениям занимал бы секунды.
+    """
+    match = _fts_match(terms)
+    candidates = settings.NEWS_SEARCH_MAX_CANDIDATES
+    with connection.cursor() as cursor:
+        # Считать дальше лимита незачем: важно лишь, превышен ли он.
+        cursor.execute(
+            f'SELECT count(*) FROM (SELECT 1 FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s LIMIT %s)',
+            [match, candidates + 1],
+        )
+        truncated = cursor.fetchone()[0] > candidates
+        cursor.execute(
+            f'SELECT rowid, snippet({FTS_TABLE}, 1, %s, %s, %s, %s) '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            'AND rowid >= COALESCE(('
+            f'SELECT min(rowid) FROM (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s)'
+            '), 0) '
+            f'ORDER BY bm25({FTS_TABLE}, %s, 1.0) LIMIT %s OFFSET %s',
+            [
+                MARK_START, MARK_END, '…', SNIPPET_WORDS, match,
+                match, candidates, float(TITLE_WEIGHT), limit, offset,
+            ],
+        )
+        found = [(pk, _fts_snippet(raw)) for pk, raw in cursor.fetchall()]
+    return found, truncated
+
+
+class PythonIndex:
+    """
+    Обратный индекс в памяти: слово -> {id новости: частота}.
+
+    Ранжирование по BM25, слова заголовка учитываются TITLE_WEIGHT раз;
+    как и в FTS5, ранжируются только последние добавленные совпадения.
+    search возвращает результаты и признак того, что совпадения отброшены.
+    Строится при первом поиске; сигналы News обновляют уже построенный
+    индекс, а версия в кэше сообщает о правках из других процессов.
+    """
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.version = None
+        self._lock = threading.RLock()
+        self._clear()
+
+    def reset(self):
+        """Забывает индекс: следующий поиск построит его заново."""
+        with self._lock:
+            self.version = None
+            self._clear()
+
+    def _clear(self):
+        self.postings = {}
+        self.lengths = {}
+        self.terms = {}
+        self.total_length = 0
+
+    def _add(self, pk, title, text):
+        self._remove(pk)
+        frequencies = Counter(tokenize(text))
+        for term in tokenize(title):
+            frequencies[term] += TITLE_WEIGHT
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[pk] = frequency
+        self.terms[pk] = tuple(frequencies)
+        self.lengths[pk] = sum(frequencies.values())
+        self.total_length += self.lengths[pk]
+
+    def _remove(self, pk):
+        for term in self.terms.pop(pk, ()):
+            documents = self.postings[term]
+            del documents[pk]
+            if not documents:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(pk, 0)
+
+    def refresh(self):
+        version = get_search_version()
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                self._clear()
+                for pk, title, text in News.objects.values_list(
+                    'pk', 'title', 'text'
+                ).iterator():
+                    self._add(pk, title, text)
+                self.version = version
+
+    def news_saved(self, news):
+        with self._lock:
+            if self.version is not None:
+                self._add(news.pk, news.title, news.text)
+        self._publish()
+        transaction.on_commit(self._publish)
+
+    def news_deleted(self, pk):
+        with self._lock:
+            if self.version is not None:
+                self._remove(pk)
+        self._publish()
+        transaction.on_commit(self._publish)
+
+    def _publish(self):
+        """
+        Меняет версию: остальные процессы перестроят индекс.
+
+        Свой индекс правку уже учёл и получает новую версию сразу.
+        Версия меняется и после фиксации транзакции, иначе процесс,
+        успевший перестроить индекс до неё, остался бы без правки.
+        """
+        version = bump_search_version()
+        with self._lock:
+            if self.version is not None:
+                self.version = version
+
+    def _postings(self, terms):
+        """Списки новостей по словам, от самого короткого."""
+        candidates = [self.postings.get(term, {}) for term in terms]
+        if not all(candidates):
+            return []
+        return sorted(candidates, key=len)
+
+    def _matching(self, candidates):
+        if not candidates:
+            return
+        for pk in candidates[0]:
+            if all(pk in documents for documents in candidates[1:]):
+                yield pk
+
+    def matching(self, terms):
+        """Все новости, где есть все слова, без ранжирования: их id."""
+        self.refresh()
+        with self._lock:
+            return list(self._matching(self._postings(terms)))
+
+    def search(self, terms, offset, limit):
+        self.refresh()
+        with self._lock:
+            candidates = self._postings(terms)
+            if not candidates:
+                return [], False
+            matching = list(self._matching(candidates))
+            truncated = len(matching) > settings.NEWS_SEARCH_MAX_CANDIDATES
+            found = heapq.nlargest(
+                settings.NEWS_SEARCH_MAX_CANDIDATES, matching
+            )
+            count = len(self.lengths)
+            average = self.total_length / count
+
+            def score(pk):
+                length_factor = self.k1 * (
+                    1 - self.b + self.b * self.lengths[pk] / average
+                )
+                result = 0.0
+                for documents in candidates:
+                    frequency = documents[pk]
+                    idf = math.log(
+                        1 + (count - len(documents) + 0.5)
+                        / (len(documents) + 0.5)
+                    )
+                    result += idf * frequency * (self.k1 + 1) / (
+                        frequency + length_factor
+                    )
+                return result
+
+            ranked = heapq.nlargest(
+                offset + limit, found, key=lambda pk: (score(pk), pk)
+            )
+        return [(pk, None) for pk in ranked[offset:]], truncated
+
+
+python_index = PythonIndex()
+
+
+def use_fts():
+    backend = settings.NEWS_SEARCH_BACKEND
+    if backend == 'auto':
+        return connection.vendor == 'sqlite'
+    return backend == 'fts5'
+
+
+def filter_news(queryset, query):
+    """
+    Новости queryset, в которых есть все слова запроса.
+
+    Для поиска в админке: порядок и постраничный вывод остаются
+    за queryset. На FTS5 отбор выполняется подзапросом в той же базе.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset
+    if use_fts():
+        match = _fts_match(terms)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match],
+        ))
+    return queryset.filter(pk__in=python_index.matching(terms))
+
+
+def search(query, page=1):
+    """
+    Страница результатов поиска, ранжированных по релевантности.
+
+    Лишний результат сверх страницы говорит, есть ли следующая.
+    Страницы за пределами NEWS_SEARCH_MAX_CANDIDATES результатов
+    не бывает: 404.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    size = settings.NEWS_SEARCH_PAGE_SIZE
+    offset = (page - 1) * size
+    if offset >= settings.NEWS_SEARCH_MAX_CANDIDATES:
+        # Заодно смещение не выйдет за пределы целых чисел SQLite.
+        raise Http404('Такой страницы результатов нет.')
+    if not terms:
+        return SearchPage(query, page, [], False, False)
+    fts = use_fts()
+    backend = _fts_search if fts else python_index.search
+    found, truncated = backend(terms, offset, size + 1)
+    # Отрывки FTS5 готовы, текст нужен только индексу в памяти.
+    fields = ('title', 'date') if fts else ('title', 'date', 'text')
+    news = News.objects.only(*fields).in_bulk(
+        [pk for pk, _ in found[:size]]
+    )
+    results = [
+        SearchResult(
+            news[pk],
+            snippet if snippet is not None
+            else highlight(news[pk].text, set(terms)),
+        )
+        for pk, snippet in found[:size] if pk in news
+    ]
+    return SearchPage(query, page, results, len(found) > size, truncated)
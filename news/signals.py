@@ -0,0 +1,124 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from . import counters, ranking, search
+from .cache import (
+    bump_banned_words_version, bump_content_version, bump_news_version,
+    bump_user_version
+)
+from .metrics import count_queries
+from .models import BannedWord, Comment, News, make_excerpt
+
+
+def _bump_versions(*news_ids):
+    bump_content_version()
+    for news_id in news_ids:
+        bump_news_version(news_id)
+
+
+def invalidate(*news_ids):
+    """
+    Сбрасываем кэш главной страницы и страниц новостей.
+
+    Версии меняем сразу и ещё раз после фиксации транзакции: иначе
+    читатель, успевший между ними закэшировать старые данные,
+    видел бы их до следующей записи.
+    """
+    _bump_versions(*news_ids)
+    transaction.on_commit(partial(_bump_versions, *news_ids))
+
+
+@receiver(pre_save, sender=News, dispatch_uid='news_excerpt')
+def fill_excerpt(instance, **kwargs):
+    # Сигнал, а не save(): loaddata сохраняет объекты в обход save().
+    instance.excerpt = make_excerpt(instance.text)
+
+
+# Сигналы покрывают и представления, и админку, и каскадное удаление.
+@receiver(post_save, sender=News, dispatch_uid='news_saved')
+@receiver(post_delete, sender=News, dispatch_uid='news_deleted')
+def invalidate_news(instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver(post_save, sender=News, dispatch_uid='news_indexed')
+def index_news(instance, **kwargs):
+    # Таблицу FTS5 обновляют триггеры в самой базе.
+    if not search.use_fts():
+        search.python_index.news_saved(instance)
+
+
+@receiver(post_delete, sender=News, dispatch_uid='news_unindexed')
+def unindex_news(instance, **kwargs):
+    if not search.use_fts():
+        search.python_index.news_deleted(instance.pk)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='comment_saved')
+@receiver(post_delete, sender=Comment, dispatch_uid='comment_deleted')
+def invalidate_comment(instance, **kwargs):
+    if not counters.is_deferred():
+        invalidate(instance.news_id)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='comment_counted')
+def count_added_comment(instance, created, raw=False, **kwargs):
+    if created and not raw and not counters.is_deferred():
+        counters.comment_added(instance.news_id, instance.created)
+        ranking.comment_added(instance.news_id, instance.created)
+
+
+@receiver(post_delete, sender=Comment, dispatch_uid='comment_uncounted')
+def count_removed_comment(instance, origin=None, **kwargs):
+    # Счётчики удаляемой новости обновлять незачем.
+    if not (counters.is_news_deletion(origin) or counters.is_deferred()):
+        counters.comment_removed(instance.news_id)
+        ranking.comment_removed(instance.news_id, instance.created)
+
+
+@receiver(post_save, sender=BannedWord, dispatch_uid='banned_word_saved')
+@receiver(post_delete, sender=BannedWord, dispatch_uid='banned_word_deleted')
+def invalidate_banned_words(**kwargs):
+    """Процессы перечитают словарь при следующей проверке комментария."""
+    bump_banned_words_version()
+    transaction.on_commit(bump_banned_words_version)
+
+
+@receiver(connection_created, dispatch_uid='install_query_counter')
+def install_query_counter(connection, **kwargs):
+    # В начало списка: execute_wrapper() снимает обёртки с конца.
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+@receiver(post_migrate, dispatch_uid='install_fts')
+def install_fts(sender, using, **kwargs):
+    """Возвращает триггеры FTS5, если миграция пересоздала news_news."""
+    if sender.name == 'news':
+        search.install_fts(connections[using])
+
+
+@receiver(
+    post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='user_saved'
+)
+@receiver(
+    post_delete, sender=settings.AUTH_USER_MODEL, dispatch_uid='user_deleted'
+)
+def invalidate_user(instance, **kwargs):
+    """Процессы перечитают пользователя: пароль, права, блокировка."""
+    bump_user_version(instance.pk)
+    transaction.on_commit(partial(bump_user_version, instance.pk))
+
+
+@receiver(user_logged_out, dispatch_uid='user_logged_out')
+def forget_logged_out_user(user, **kwargs):
+    if user is not None:
+        bump_user_version(user.pk)
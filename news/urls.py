@@ -1,16 +1,47 @@
+from django.conf import settings
 from django.urls import path
 
-from news import views
+from news import ranking, views
 
 app_name = 'news'
 
+if settings.NEWS_ASYNC_READ_VIEWS:
+    home_view = views.AsyncNewsList.as_view()
+    detail_view = views.AsyncNewsDetailView.as_view()
+else:
+    home_view = views.NewsList.as_view()
+    detail_view = views.NewsDetailView.as_view()
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', home_view, name='home'),
+    path(
+        'discussed/',
+        views.NewsFeed.as_view(feed=ranking.DISCUSSED),
+        name='discussed'
+    ),
+    path(
+        'active/',
+        views.NewsFeed.as_view(feed=ranking.ACTIVE),
+        name='active'
+    ),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('news/<int:pk>/', detail_view, name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.CommentList.as_view(),
+        name='comments'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
+    path('export/', views.NewsExport.as_view(), name='export'),
+    path(
+        'moderation/comments/',
+        views.CommentModeration.as_view(),
+        name='moderate'
+    ),
+    path('stats/', views.QueryStats.as_view(), name='stats'),
 ]
@@ -1,11 +1,31 @@
+import json
+from functools import partial
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import BadRequest, PermissionDenied
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
 
-from .forms import CommentForm
+from .bulk import DELETE, FLAG, Progress, filter_comments, moderate
+from .cache import (
+    NEWS_LIST_FIELDS, aget_cached_comment_page, aget_cached_news,
+    aget_cached_news_list, get_cached_comment_page, get_cached_feed,
+    get_cached_news, get_cached_news_list
+)
+from .conditional import (
+    acondition, ahome_etag, anews_etag, home_etag, news_etag
+)
+from .export import export_lines
+from .forms import CommentForm, CommentModerationForm, bad_words
+from .metrics import request_stats
 from .models import Comment, News
+from .search import search
 
 from django.shortcuts import render
 
@@ -13,6 +33,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 
 
+@method_decorator(condition(etag_func=home_etag), name='get')
 class NewsList(generic.ListView):
     """Список новостей."""
     model = News
@@ -23,22 +44,92 @@ class NewsList(generic.ListView):
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Число комментариев и анонс хранятся в самой новости,
+        так что ни комментарии, ни полный текст не читаются.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
+        return self.model.objects.only(
+            *NEWS_LIST_FIELDS
         )[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['news_list'] = get_cached_news_list(self.object_list)
+        return context
+
+
+class AsyncNewsList(NewsList):
+    """
+    Главная страница для ASGI: запросы к базе не занимают поток.
+
+    Включается настройкой NEWS_ASYNC_READ_VIEWS.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        return await acondition(
+            request, await ahome_etag(request), partial(self.page, request)
+        )
+
+    async def page(self, request):
+        # Пользователь нужен шапке страницы; загружаем его заранее,
+        # синхронно из шаблона обратиться к базе уже нельзя.
+        request.user = await request.auser()
+        self.object_list = self.get_queryset()
+        return render(request, self.template_name, {
+            'news_list': await aget_cached_news_list(self.object_list),
+        })
+
+
+class NewsFeed(generic.TemplateView):
+    """
+    Лента новостей по рейтингу, см. news.ranking.
+
+    Рейтинг берётся из кэша, так что комментарии не читаются вовсе.
+    """
+    template_name = 'news/home.html'
+    feed = None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['news_list'] = get_cached_feed(self.feed)
+        return context
+
+
+class NewsSearch(generic.TemplateView):
+    """Поиск по заголовкам и текстам новостей: параметры q и page."""
+    template_name = 'news/search.html'
 
-class NewsDetail(generic.DetailView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            page = int(self.request.GET.get('page', '1'))
+        except ValueError:
+            page = 0
+        if page < 1:
+            raise BadRequest('Параметр page — номер страницы.')
+        context['page'] = search(
+            self.request.GET.get('q', '').strip(), page
+        )
+        return context
+
+
+class NewsMixin:
+    """Новость и первая порция её комментариев, взятые из кэша."""
     model = News
     template_name = 'news/detail.html'
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        """Новость и её комментарии кэшируются по версии новости."""
+        return get_cached_news(self.kwargs['pk'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Показываем только первую порцию комментариев,
+        # остальные подгружаются через news:comments.
+        context['page'] = get_cached_comment_page(self.object.pk)
+        return context
+
+
+class NewsDetail(NewsMixin, generic.DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -47,14 +138,27 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class CommentList(generic.TemplateView):
+    """Следующая порция комментариев к новости («Показать ещё»)."""
+    template_name = 'news/includes/comment_list.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Неизвестная новость — 404, а не пустая порция в кэше.
+        get_cached_news(self.kwargs['pk'])
+        context['page'] = get_cached_comment_page(
+            self.kwargs['pk'], self.request.GET.get('after')
+        )
+        return context
+
+
 class NewsComment(
         LoginRequiredMixin,
+        NewsMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
-    model = News
     form_class = CommentForm
-    template_name = 'news/detail.html'
 
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
@@ -66,7 +170,7 @@ class NewsComment(
         comment.author = self.request.user
         comment.save()
         return super().form_valid(form)
-    
+
     def form_invalid(self, form):
         # Возвращаем ответ с формой в контексте
         return self.render_to_response(
@@ -74,19 +178,55 @@ class NewsComment(
         )
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
+    """Страница новости: GET показывает её, POST добавляет комментарий."""
+    # Представления собираются один раз при импорте модуля,
+    # а не заново на каждый запрос.
+    detail_view = staticmethod(NewsDetail.as_view())
+    comment_view = staticmethod(NewsComment.as_view())
 
+    @method_decorator(condition(etag_func=news_etag))
     def get(self, request, *args, **kwargs):
-        view = NewsDetail.as_view()
-        return view(request, *args, **kwargs)
+        return self.detail_view(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        view = NewsComment.as_view()
-        return view(request, *args, **kwargs)
+        return self.comment_view(request, *args, **kwargs)
+
+
+class AsyncNewsDetailView(generic.View):
+    """
+    Страница новости для ASGI: чтение асинхронное.
+
+    Добавление комментария по-прежнему выполняет синхронный NewsComment.
+    """
+    comment_view = staticmethod(sync_to_async(NewsComment.as_view()))
+
+    async def get(self, request, *args, **kwargs):
+        return await acondition(
+            request,
+            await anews_etag(request, kwargs['pk']),
+            partial(self.page, request, kwargs['pk']),
+        )
+
+    async def page(self, request, pk):
+        request.user = await request.auser()
+        news = await aget_cached_news(pk)
+        context = {
+            'object': news,
+            'news': news,
+            'page': await aget_cached_comment_page(news.pk),
+        }
+        if request.user.is_authenticated:
+            context['form'] = CommentForm()
+        return render(request, NewsDetail.template_name, context)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.comment_view(request, *args, **kwargs)
 
 
 class CommentBase(LoginRequiredMixin):
@@ -94,14 +234,21 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        # Новость нужна только ради id, он уже есть в самом комментарии.
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями.
+
+        Заголовок новости нужен шаблонам редактирования и удаления,
+        поэтому новость подтягиваем тем же запросом, но без её текста.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news').only('news__title', 'text', 'created')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -114,6 +261,104 @@ class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
 
+    def get_queryset(self):
+        if self.request.method != 'POST':
+            return super().get_queryset()
+        # Удалению и сигналам нужны только новость и время создания.
+        return self.model.objects.filter(
+            author=self.request.user
+        ).only('news', 'created')
+
+
+class StaffRequiredMixin(UserPassesTestMixin):
+    """Доступ только для сотрудников редакции."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+
+class NewsExport(StaffRequiredMixin, generic.View):
+    """
+    Потоковая выгрузка новостей с комментариями.
+
+    Параметры: format (jsonl или csv) и after — id новости,
+    после которой продолжить прерванную выгрузку.
+    """
+    content_types = {
+        'jsonl': 'application/jsonl; charset=utf-8',
+        'csv': 'text/csv; charset=utf-8',
+    }
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get('format', 'jsonl')
+        if file_format not in self.content_types:
+            file_format = 'jsonl'
+        after = request.GET.get('after')
+        if after is not None:
+            # isdigit() пропустил бы «²», который int() не разбирает.
+            try:
+                after = int(after)
+            except ValueError:
+                raise BadRequest('Параметр after — это id новости.')
+            after = get_object_or_404(News.objects.only('date'), pk=after)
+        response = StreamingHttpResponse(
+            export_lines(file_format, after),
+            content_type=self.content_types[file_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="news.{file_format}"'
+        )
+        return response
+
+
+class CommentModeration(StaffRequiredMixin, generic.View):
+    """
+    Пакетное удаление или отметка комментариев по фильтрам.
+
+    Поля POST — из CommentModerationForm. Ответ — поток JSON-строк
+    с нарастающими итогами после каждой пачки; последняя строка
+    с done: true. Кроме статуса сотрудника нужно право на действие,
+    как у действий CommentAdmin.
+    """
+    permissions = {
+        DELETE: 'news.delete_comment',
+        FLAG: 'news.change_comment',
+    }
+
+    def post(self, request, *args, **kwargs):
+        form = CommentModerationForm(request.POST)
+        if not form.is_valid():
+            return JsonResponse(
+                {'errors': form.errors}, status=400,
+                json_dumps_params={'ensure_ascii': False},
+            )
+        action = form.cleaned_data['action']
+        if not request.user.has_perm(self.permissions[action]):
+            raise PermissionDenied
+        return StreamingHttpResponse(
+            self.progress(form),
+            content_type='application/jsonl; charset=utf-8',
+        )
+
+    def progress(self, form):
+        progress = Progress(0, 0, 0)
+        for progress in moderate(
+            filter_comments(**form.filters()),
+            form.cleaned_data['action'],
+            bad_words if form.cleaned_data['banned'] else None,
+        ):
+            yield json.dumps({**progress._asdict(), 'done': False}) + '\n'
+        yield json.dumps({**progress._asdict(), 'done': True}) + '\n'
+
+
+class QueryStats(StaffRequiredMixin, generic.View):
+    """Процентили числа SQL-запросов и времени ответа по маршрутам."""
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(
+            request_stats.summary(), json_dumps_params={'ensure_ascii': False}
+        )
+
 
 # @login_required
 def user_logout(request):
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,6 +23,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'news.middleware.QueryStatsMiddleware',
+    'news.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,6 +61,103 @@ DATABASES = {
     }
 }
 
+# Профили SQLite; нужный выбирается переменной окружения
+# YANEWS_SQLITE_PROFILE. В боевом профиле журнал WAL: читатели не ждут
+# писателя. Транзакции начинаются с BEGIN IMMEDIATE, поэтому писатель
+# берёт блокировку сразу и ждёт её до timeout секунд. Без этого
+# транзакция, начавшаяся с чтения, получает «database is locked» без
+# ожидания. Соединения живут CONN_MAX_AGE секунд и не открываются
+# заново на каждый запрос.
+SQLITE_PROFILES = {
+    'development': {
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'OPTIONS': {},
+    },
+    'production': {
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode = WAL;'
+                # В WAL теряются лишь последние транзакции при сбое
+                # питания, но не целостность базы.
+                'PRAGMA synchronous = NORMAL;'
+                # Отрицательное значение — в килобайтах: 64 МБ.
+                'PRAGMA cache_size = -65536;'
+                'PRAGMA mmap_size = 268435456;'
+                'PRAGMA temp_store = MEMORY;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    },
+}
+SQLITE_PROFILE = os.environ.get('YANEWS_SQLITE_PROFILE', 'development')
+DATABASES['default'].update(SQLITE_PROFILES[SQLITE_PROFILE])
+
+# Реплики для чтения новостей и комментариев (news.routers). Для проверки
+# без настоящей репликации укажите в YANEWS_SQLITE_REPLICA путь к копии
+# db.sqlite3. В тестах реплика — зеркало основной базы.
+NEWS_READ_REPLICAS = []
+if replica := os.environ.get('YANEWS_SQLITE_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    NEWS_READ_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['news.routers.ReplicaRouter']
+# Сколько секунд после своей правки пользователь читает с основной базы:
+# не меньше, чем отстаёт реплика.
+NEWS_REPLICA_LAG = 10
+NEWS_PRIMARY_COOKIE = 'news_primary'
+
+# По версиям в кэше процессы узнают об изменениях новостей, словаря
+# запрещённых слов и пользователей. Кэш в памяти у каждого процесса свой:
+# с несколькими процессами укажите общий Redis в YANEWS_REDIS_URL,
+# иначе manage.py check предупредит (news.W002). RedisCache нужен пакет
+# redis (requirements.txt).
+if redis_url := os.environ.get('YANEWS_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': redis_url,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+SHARED_CACHE = bool(redis_url)
+
+# Сессии: db читает сессию из базы на каждом запросе, cached_db — из кэша,
+# signed_cookies хранит её целиком в подписанной cookie (её нельзя
+# отозвать на сервере до истечения). Выход и смена пароля убирают сессию
+# из кэша только того процесса, где случились, поэтому cached_db по
+# умолчанию включается лишь с общим кэшем. Выбор — YANEWS_SESSION_ENGINE.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[
+    os.environ.get(
+        'YANEWS_SESSION_ENGINE', 'cached_db' if SHARED_CACHE else 'db'
+    )
+]
+
+# С общим кэшем пользователь сессии берётся из памяти процесса
+# (news.auth): версию пользователя в кэше видят все процессы. ModelBackend
+# оставлен для сессий, начатых до его появления.
+AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+if SHARED_CACHE:
+    AUTHENTICATION_BACKENDS.insert(0, 'news.auth.CachedModelBackend')
+# Сколько пользователей держит в памяти каждый процесс.
+NEWS_USER_CACHE_SIZE = 10_000
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +180,40 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+COMMENT_COUNT_ON_DETAIL_PAGE = 50
+
+# Асинхронные главная страница и страница новости (для запуска под ASGI).
+NEWS_ASYNC_READ_VIEWS = False
+
+# Сколько секунд хранить отрисованные фрагменты страниц.
+NEWS_CACHE_TIMEOUT = 60 * 15
+
+# Окно ленты «самое обсуждаемое» в часах и сколько секунд живут
+# рейтинги лент до пересчёта (его можно ускорить refresh_rankings).
+NEWS_TRENDING_WINDOW_HOURS = 24
+NEWS_RANKING_TIMEOUT = 60 * 5
+
+# Поиск: 'auto' — FTS5 на SQLite и индекс в памяти на других базах,
+# 'fts5' или 'python' — выбрать явно.
+NEWS_SEARCH_BACKEND = 'auto'
+NEWS_SEARCH_PAGE_SIZE = 20
+# Сколько последних совпадений ранжировать по релевантности.
+NEWS_SEARCH_MAX_CANDIDATES = 10_000
+
+# Сколько замеров на каждый маршрут хранить для процентилей (news:stats).
+QUERY_STATS_SAMPLE_SIZE = 1000
+
+# Допустимое число SQL-запросов на один запрос к странице, включая
+# сессию и пользователя. Превышения пишутся в лог news.middleware.
+QUERY_BUDGETS = {
+    'news:home': 3,
+    'news:discussed': 3,
+    'news:active': 3,
+    'news:detail': 6,
+    'news:comments': 3,
+    'news:edit': 5,
+    'news:delete': 6,
+    'news:search': 4,
+}
+QUERY_BUDGET_LOGGING = True